@@ -0,0 +1,160 @@
+"""Memory-mapped pack of templates pre-scaled to the badge size.
+
+Every render process maps the same file read-only and wraps its pixels as
+Pillow images, so no process decodes or resizes the template PNGs itself.
+One pack file holds every template at one badge size; it is rebuilt when a
+source PNG changes or a template is missing from it.
+
+Usage: python asset_pack.py build|info [--pack-dir DIR] [--tier TIER] [--paper PAPER] [--grid ROWSxCOLS] [PNG ...]
+"""
+import argparse
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+
+from PIL import Image
+
+DEFAULT_PACK_DIR = ".badge_assets"
+MAGIC = b"BADGEPK1"
+HEADER = struct.Struct("<8sQQ")  # Magic, offset and length of the JSON index after the pixel data
+ALIGN = mmap.PAGESIZE  # Each template starts on its own page
+
+
+class AssetPack:
+    def __init__(self, pack_dir=DEFAULT_PACK_DIR):
+        self.pack_dir = pack_dir
+        self.maps = {}  # (size, mode) -> (pack file stat, index, memoryview of the mapped file)
+        self.hits = 0
+        self.misses = 0  # Templates that had to be (re)built into the pack
+        self.lock = threading.RLock()  # Batch runs share one pack between threads
+
+    def pack_path(self, size, mode):
+        return os.path.join(self.pack_dir, f"templates-{size[0]}x{size[1]}-{mode}.pack")
+
+    @staticmethod
+    def source_stamp(path):
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def image(self, path, size, mode="RGBA"):
+        """Read-only template at size, mapped from the pack; copy it before drawing."""
+        size = tuple(size)
+        with self.lock:
+            index, view = self.open(size, mode)
+            entry = index.get(os.path.abspath(path))
+            if entry is None or entry["source"] != self.source_stamp(path):
+                self.misses += 1
+                self.build([path], size, mode)
+                index, view = self.open(size, mode)
+                entry = index[os.path.abspath(path)]
+            else:
+                self.hits += 1
+            pixels = view[entry["offset"]:entry["offset"] + entry["length"]]
+        return Image.frombuffer(mode, size, pixels, "raw", mode, 0, 1)
+
+    def ensure(self, paths, size, mode="RGBA"):
+        """Build every missing or stale template in one pass, e.g. before starting worker processes."""
+        size = tuple(size)
+        with self.lock:
+            index, _ = self.open(size, mode)
+            stale = [path for path in paths
+                     if index.get(os.path.abspath(path), {}).get("source") != self.source_stamp(path)]
+            if stale:
+                self.build(stale, size, mode)
+            return stale
+
+    def open(self, size, mode):
+        """Index and mapped bytes of the pack, remapped when another process replaced the file."""
+        path = self.pack_path(size, mode)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return {}, None
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self.maps.get((size, mode))
+        if cached is not None and cached[0] == stamp:
+            return cached[1], cached[2]
+
+        with open(path, "rb") as pack_file:
+            # Images handed out earlier keep the old mapping alive, so it is never closed here
+            view = memoryview(mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ))
+        magic, index_offset, index_length = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a badge asset pack")
+        index = json.loads(bytes(view[index_offset:index_offset + index_length]))
+        self.maps[(size, mode)] = (stamp, index, view)
+        return index, view
+
+    def build(self, paths, size, mode):
+        """Rewrite the pack with paths decoded and scaled afresh, keeping the other templates still current."""
+        index, view = self.open(size, mode)
+        sources = {}  # absolute path -> bytes of the pre-scaled pixels
+        for source, entry in index.items():
+            if os.path.exists(source) and entry["source"] == self.source_stamp(source):
+                sources[source] = view[entry["offset"]:entry["offset"] + entry["length"]]
+        for path in paths:
+            with Image.open(path) as image:
+                sources[os.path.abspath(path)] = image.convert(mode).resize(size).tobytes()
+
+        entries = {}
+        offset = ALIGN  # The header has the first page to itself
+        for source, pixels in sources.items():
+            entries[source] = {"source": self.source_stamp(source), "offset": offset, "length": len(pixels)}
+            offset = self.align(offset + len(pixels))
+        encoded_index = json.dumps(entries).encode()
+
+        os.makedirs(self.pack_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.pack_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as pack_file:
+            pack_file.write(HEADER.pack(MAGIC, offset, len(encoded_index)))
+            for source, entry in entries.items():
+                pack_file.seek(entry["offset"])
+                pack_file.write(sources[source])
+            pack_file.seek(offset)
+            pack_file.write(encoded_index)
+        os.chmod(temp_path, 0o644)  # mkstemp makes it private; services running as other users map it too
+        os.replace(temp_path, self.pack_path(size, mode))  # Readers see the old pack or the new one, never half
+
+    @staticmethod
+    def align(offset):
+        return -(-offset // ALIGN) * ALIGN
+
+
+def main(argv=None):
+    from layout import GRID, PAPERS, parse_grid
+    from main import TIERS, backside_template, template_men, template_women, tier_sizes
+
+    parser = argparse.ArgumentParser(description="Build or inspect the pre-scaled template pack.")
+    parser.add_argument("command", choices=("build", "info"))
+    parser.add_argument("templates", nargs="*", help="PNG files to pack (default: every PNG here)")
+    parser.add_argument("--pack-dir", default=DEFAULT_PACK_DIR)
+    parser.add_argument("--tier", choices=TIERS, default="print")
+    parser.add_argument("--paper", choices=PAPERS, default="A4")
+    parser.add_argument("--grid", type=parse_grid, default=GRID, metavar="ROWSxCOLS")
+    args = parser.parse_args(argv)
+
+    pack = AssetPack(args.pack_dir)
+    _, badge_size = tier_sizes(args.tier, args.paper, args.grid)
+    if args.command == "build":
+        # Hotel backsides are looked up as "<hotel>.png", so pack every PNG next to the standard templates
+        templates = args.templates or sorted(set(glob.glob("*.png")) | {template_men, template_women,
+                                                                         backside_template})
+        built = pack.ensure(templates, badge_size)
+        print(f"Packed {len(templates)} templates at {badge_size[0]}x{badge_size[1]} ({len(built)} rebuilt) "
+              f"in {pack.pack_path(badge_size, 'RGBA')}")
+    else:
+        index, _ = pack.open(badge_size, "RGBA")
+        for source, entry in sorted(index.items()):
+            state = "current" if os.path.exists(source) and entry["source"] == pack.source_stamp(source) else "stale"
+            print(f"{entry['length'] / (1024 * 1024):8.1f} MB  {state:<8} {source}")
+        if not index:
+            print(f"No pack for {badge_size[0]}x{badge_size[1]} in {args.pack_dir}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
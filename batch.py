@@ -0,0 +1,154 @@
+"""Build one badge PDF per group from a passenger manifest.
+
+Usage: python batch.py manifest.csv [--output-dir DIR] [--jobs N] [--workers N] [--codec flate|jpeg|png]
+                      [--cache-dir DIR] [--vector] [--profile [PATH]]
+
+The manifest is a CSV with a header row, or a JSON list of objects, with
+name, gender, group, hotel and destination for every passenger. All groups
+are built in this process and share one template cache and one font cache.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asset_pack import DEFAULT_PACK_DIR, AssetPack
+from font_fitter import FontFitter
+from layout import GRID, PAPERS, parse_grid
+from main import TIERS, BadgeMaker, backside_template, font_path, template_men, template_women, text_color
+from pdf_writer import CODECS
+from preflight import PreflightError
+from render_cache import DEFAULT_CACHE_DIR, RenderCache
+from template_cache import TemplateCache
+from text_runs import TextRunCache
+
+COLUMNS = ("name", "gender", "group", "hotel", "destination")
+
+
+def read_manifest(path):
+    """Load passengers from a CSV or JSON manifest."""
+    with open(path, newline="", encoding="utf-8") as manifest:
+        if path.lower().endswith(".json"):
+            passengers = json.load(manifest)
+        else:
+            passengers = list(csv.DictReader(manifest))
+
+    for line, passenger in enumerate(passengers, start=1):
+        missing = [column for column in COLUMNS if not str(passenger.get(column) or "").strip()]
+        if missing:
+            raise ValueError(f"{path}: passenger {line} is missing {', '.join(missing)}")
+    return [{column: str(passenger[column]).strip() for column in COLUMNS} for passenger in passengers]
+
+
+def group_passengers(passengers):
+    """Split passengers into (group, hotel, destination) jobs, keeping manifest order."""
+    jobs = {}
+    for passenger in passengers:
+        key = (passenger["group"], passenger["hotel"], passenger["destination"])
+        jobs.setdefault(key, []).append({"name": passenger["name"], "gender": passenger["gender"].upper()})
+    return jobs
+
+
+def output_name(group, hotel_name, destination, tier="print"):
+    """Name the PDF like the hand-made ones, e.g. 152-Makkah-AlEbaa.pdf, or 152-Makkah-AlEbaa-draft.pdf for proofs."""
+    group_number = group.split()[-1]
+    suffix = "" if tier == "print" else f"-{tier}"
+    return f"{group_number}-{destination.title()}-{re.sub(r'[^0-9A-Za-z]', '', hotel_name)}{suffix}.pdf"
+
+
+def build_group(job, names_with_gender, output_dir, templates, fonts, options):
+    group, hotel_name, destination = job
+    output_pdf = os.path.join(output_dir, output_name(group, hotel_name, destination, options["tier"]))
+    start_time = time.time()
+    badge_maker = BadgeMaker(template_men, template_women, backside_template, font_path, output_pdf, text_color,
+                             stream=True, templates=templates, fonts=fonts, verbose=False, **options)
+    badge_maker.process(names_with_gender, group, badge_maker.badge_size, badge_maker.page_size, hotel_name,
+                        destination)
+    badge_maker.create_pdf()
+    return output_pdf, time.time() - start_time, badge_maker
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build badge PDFs for every group in a manifest.")
+    parser.add_argument("manifest", help="CSV or JSON file with name, gender, group, hotel, destination")
+    parser.add_argument("--output-dir", default=".", help="directory for the generated PDFs")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="groups built at the same time")
+    parser.add_argument("--workers", type=int, default=1, help="render processes per group")
+    parser.add_argument("--codec", choices=CODECS, default="flate", help="page image encoding")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="rendered badge cache for incremental rebuilds ('' to disable)")
+    parser.add_argument("--tier", choices=TIERS, default="print", help="resolution: draft (1x), proof (2x), print (4x)")
+    parser.add_argument("--paper", choices=PAPERS, default="A4", help="sheet size")
+    parser.add_argument("--grid", type=parse_grid, default=GRID, metavar="ROWSxCOLS",
+                        help="badges per sheet (default: 3x3)")
+    parser.add_argument("--duplex", action="store_true", help="mirror back page columns for two-sided printing")
+    parser.add_argument("--asset-pack", default=DEFAULT_PACK_DIR,
+                        help="directory of memory-mapped pre-scaled templates ('' to decode the PNGs)")
+    parser.add_argument("--vector", action="store_true", help="embed templates once and write names as PDF text")
+    parser.add_argument("--profile", nargs="?", const="profile.json", metavar="PATH",
+                        help="write per-group stage timings and cache hit rates as JSON (default: profile.json)")
+    args = parser.parse_args(argv)
+
+    jobs = group_passengers(read_manifest(args.manifest))
+    os.makedirs(args.output_dir, exist_ok=True)
+    templates = TemplateCache(pack=AssetPack(args.asset_pack) if args.asset_pack else None)
+    fonts = FontFitter(font_path)
+    options = {"workers": args.workers, "codec": args.codec, "cache_dir": args.cache_dir or None,
+               "vector": args.vector, "tier": args.tier, "paper": args.paper, "grid": args.grid, "duplex": args.duplex,
+               "asset_pack": args.asset_pack or None, "text_runs": TextRunCache()}
+
+    # Check every group up front, so a bad row in the last group fails the run before any PDF is rendered
+    checker = BadgeMaker(template_men, template_women, backside_template, font_path, None, text_color,
+                         templates=templates, fonts=fonts, verbose=False, **options)
+    problems = []
+    for (group, hotel_name, destination), names_with_gender in jobs.items():
+        checks = checker.check_roster(names_with_gender, group, hotel_name, destination)
+        for note in checks.notes:
+            print(f"Note: {group}: {note}")
+        problems.extend(f"{group} / {hotel_name}: {problem}" for problem in checks.problems)
+    if problems:
+        print(PreflightError(problems), file=sys.stderr)
+        return 1
+
+    start_time = time.time()
+    print(f"Building {len(jobs)} PDFs for {sum(map(len, jobs.values()))} passengers...")
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = {
+            job: executor.submit(build_group, job, names_with_gender, args.output_dir, templates, fonts, options)
+            for job, names_with_gender in jobs.items()
+        }
+        results = {job: future.result() for job, future in futures.items()}
+
+    print(f"\n{'group':<12} {'hotel':<16} {'destination':<12} {'passengers':>10} {'seconds':>8}  output")
+    for job, (output_pdf, seconds, _) in results.items():
+        group, hotel_name, destination = job
+        print(f"{group:<12} {hotel_name:<16} {destination:<12} {len(jobs[job]):>10} {seconds:>8.2f}  {output_pdf}")
+    print(f"Total: {time.time() - start_time:.2f} seconds")
+
+    if args.cache_dir:
+        # One stats update for the whole run, so last_run covers every group rather than whichever finished last
+        run_counts = {}
+        for _, _, badge_maker in results.values():
+            for name, value in badge_maker.render_cache_counts().items():
+                run_counts[name] = run_counts.get(name, 0) + value
+        RenderCache(args.cache_dir).save_stats(run_counts)
+
+    if args.profile:
+        # Template and font caches are shared, so their counters cover every group built so far
+        reports = []
+        for job, (_, _, badge_maker) in results.items():
+            group, hotel_name, destination = job
+            report = badge_maker.profiler.report(badge_maker.cache_counters())
+            reports.append(dict(group=group, hotel=hotel_name, destination=destination, passengers=len(jobs[job]),
+                                **report))
+        with open(args.profile, "w", encoding="utf-8") as profile_file:
+            json.dump({"wall_seconds": round(time.time() - start_time, 4), "groups": reports}, profile_file, indent=2)
+        print(f"Profile saved as {args.profile}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Encode time and PDF size for each page codec supported by PdfWriter.
+
+Run from anywhere: python benchmarks/bench_codecs.py [front pages]
+The pages are rendered once up front, so only encoding and PDF output are timed.
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import BadgeMaker, badge_size, page_size, text_color  # noqa: E402
+from pdf_writer import PdfWriter  # noqa: E402
+
+CONFIGS = [
+    {"codec": "png", "compress_level": 1},
+    {"codec": "png", "compress_level": 6},
+    {"codec": "png", "compress_level": 9},
+    {"codec": "jpeg", "quality": 75},
+    {"codec": "jpeg", "quality": 90},
+    {"codec": "jpeg", "quality": 95},
+    {"codec": "flate"},
+]
+
+
+def main(argv):
+    os.chdir(ROOT)
+    front_pages = int(argv[0]) if argv else 2
+    names_with_gender = [
+        {"name": f"PASSENGER{idx} NAME{idx}", "gender": "M" if idx % 2 else "F"}
+        for idx in range(front_pages * 9)
+    ]
+    badge_maker = BadgeMaker("M.png", "F.png", "backside.png", "Unbounded-Bold.ttf", None, text_color)
+    badge_maker.process(names_with_gender, "GROUP 1", badge_size, page_size, "Al-Ebaa", "MAKKAH")
+    back_pages = list(badge_maker.back_pages.values())
+
+    print(f"\n{'codec':<28} {'encode s':>9} {'write s':>8} {'PDF KB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for config in CONFIGS:
+            output_pdf = os.path.join(tmp, "bench.pdf")
+            writer = PdfWriter(output_pdf, **config)
+            start = time.perf_counter()
+            for page in badge_maker.pages:
+                writer.add_page(page, shared=any(page is back_page for back_page in back_pages))
+            encoded = time.perf_counter()
+            writer.close()
+            written = time.perf_counter()
+            label = ", ".join(f"{key}={value}" for key, value in config.items())
+            size_kb = os.path.getsize(output_pdf) / 1024
+            print(f"{label:<28} {encoded - start:>9.2f} {written - encoded:>8.2f} {size_kb:>9.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,60 @@
+"""Peak RSS of a full badge run against page count, buffered vs streaming.
+
+Run from anywhere: python benchmarks/bench_memory.py [page counts...]
+Each measurement runs in a fresh interpreter so ru_maxrss is per job.
+Streaming is not flat: it still grows by about each page's compressed size, since
+FPDF keeps the encoded images until the file is written.
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PAGE_COUNTS = [1, 5, 10, 25, 50]
+
+
+def run_job(front_pages, stream):
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    from main import BadgeMaker, badge_size, page_size, text_color
+
+    names_with_gender = [
+        {"name": f"PASSENGER{idx} NAME{idx}", "gender": "M" if idx % 2 else "F"}
+        for idx in range(front_pages * 9)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        output_pdf = os.path.join(tmp, "bench.pdf")
+        badge_maker = BadgeMaker("M.png", "F.png", "backside.png", "Unbounded-Bold.ttf", output_pdf, text_color,
+                                 stream=stream)
+        badge_maker.process(names_with_gender, "GROUP 1", badge_size, page_size, "Al-Ebaa", "MAKKAH")
+        badge_maker.create_pdf()
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+
+
+def measure(front_pages, stream):
+    result = subprocess.run(
+        [sys.executable, __file__, "--job", str(front_pages), "stream" if stream else "buffered"],
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv):
+    if argv[:1] == ["--job"]:
+        print(run_job(int(argv[1]), argv[2] == "stream"))
+        return
+
+    page_counts = [int(arg) for arg in argv] or DEFAULT_PAGE_COUNTS
+    print(f"{'pages':>6} {'buffered MB':>12} {'streaming MB':>13}")
+    for front_pages in page_counts:
+        buffered = measure(front_pages, stream=False)
+        streaming = measure(front_pages, stream=True)
+        print(f"{front_pages * 2:>6} {buffered:>12.0f} {streaming:>13.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
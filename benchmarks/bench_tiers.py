@@ -0,0 +1,49 @@
+"""Render time and output size for each resolution tier.
+
+Run from anywhere: python benchmarks/bench_tiers.py [names]
+Every tier renders the same synthetic roster to a PDF, then to a PNG contact sheet.
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import TIERS, BadgeMaker, group, text_color, tier_sizes  # noqa: E402
+from suite import synthetic_roster  # noqa: E402
+
+
+def render(tier, roster, output_pdf, contact_sheet=None):
+    """Seconds to render the roster at tier, into output_pdf or a contact sheet PNG."""
+    badge_maker = BadgeMaker("M.png", "F.png", "backside.png", "Unbounded-Bold.ttf", output_pdf, text_color,
+                             stream=not contact_sheet, verbose=False, tier=tier)
+    start = time.perf_counter()
+    badge_maker.process(roster, group, badge_maker.badge_size, badge_maker.page_size, "Al-Ebaa", "MAKKAH")
+    if contact_sheet:
+        badge_maker.save_contact_sheet(contact_sheet)
+    else:
+        badge_maker.create_pdf()
+    return time.perf_counter() - start
+
+
+def main(argv):
+    os.chdir(ROOT)
+    roster = synthetic_roster(int(argv[0]) if argv else 90)
+
+    print(f"{'tier':<6} {'page px':>11} {'PDF s':>7} {'PDF KB':>8} {'sheet s':>8} {'sheet KB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for tier in TIERS:
+            output_pdf = os.path.join(tmp, f"{tier}.pdf")
+            contact_sheet = os.path.join(tmp, f"{tier}.png")
+            pdf_seconds = render(tier, roster, output_pdf)
+            sheet_seconds = render(tier, roster, None, contact_sheet)
+            (page_width, page_height), _ = tier_sizes(tier)
+            print(f"{tier:<6} {f'{page_width}x{page_height}':>11} {pdf_seconds:>7.2f} "
+                  f"{os.path.getsize(output_pdf) / 1024:>8.0f} {sheet_seconds:>8.2f} "
+                  f"{os.path.getsize(contact_sheet) / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
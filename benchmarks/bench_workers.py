@@ -0,0 +1,49 @@
+"""Wall time of BadgeMaker.process for 1..N worker processes on a few hundred names.
+
+Run from anywhere: python benchmarks/bench_workers.py [names] [max workers]
+Pages are streamed as JPEG. With more than one worker each worker encodes its own
+page range into a partial PDF (needs pypdf), and the merge time is part of the total.
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import BadgeMaker, badge_size, page_size, text_color  # noqa: E402
+
+
+def run(names_with_gender, workers, output_pdf):
+    badge_maker = BadgeMaker("M.png", "F.png", "backside.png", "Unbounded-Bold.ttf", output_pdf, text_color,
+                             stream=True, codec="jpeg", workers=workers)
+    start = time.perf_counter()
+    badge_maker.process(names_with_gender, "GROUP 1", badge_size, page_size, "Al-Ebaa", "MAKKAH")
+    badge_maker.create_pdf()
+    return time.perf_counter() - start, os.path.getsize(output_pdf) / 1024
+
+
+def main(argv):
+    os.chdir(ROOT)
+    total_names = int(argv[0]) if argv else 300
+    max_workers = int(argv[1]) if len(argv) > 1 else os.cpu_count()
+    names_with_gender = [
+        {"name": f"PASSENGER{idx} NAME{idx}", "gender": "M" if idx % 2 else "F"}
+        for idx in range(total_names)
+    ]
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in range(1, max_workers + 1):
+            results.append((workers, *run(names_with_gender, workers, os.path.join(tmp, f"bench-{workers}.pdf"))))
+
+    serial = results[0][1]
+    print(f"\n{total_names} names")
+    print(f"{'workers':>8} {'seconds':>8} {'speedup':>8} {'PDF KB':>8}")
+    for workers, seconds, size_kb in results:
+        print(f"{workers:>8} {seconds:>8.2f} {serial / seconds:>7.2f}x {size_kb:>8.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
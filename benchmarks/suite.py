@@ -0,0 +1,207 @@
+"""Reproducible benchmark suite for the badge pipeline.
+
+Run from anywhere:
+    python benchmarks/suite.py [--sizes 10 100 1000 5000] [--output results.json]
+                               [--baseline baseline.json] [--threshold 0.10] [--codec flate|jpeg|png]
+
+Synthetic rosters are generated from a fixed seed, so two runs render the
+same names. Each stage is timed on its own in this process, and every roster
+size runs end-to-end (process + create_pdf) in a fresh interpreter so its
+peak RSS is its own. Results are written as JSON; with --baseline, any
+timing or memory figure more than --threshold worse than the baseline is
+reported as a regression and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pdf_writer import CODECS  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+SYLLABLES = ["MA", "KH", "MU", "DOV", "ZO", "KIR", "JON", "NA", "DI", "RA", "SHA", "RI", "TU", "RO", "AB", "DUL",
+             "LOH", "BEK", "ZOD", "GUL", "CHEH", "RA", "KHON", "NUR", "MAT", "TOSH", "PU", "LAT", "ZAY", "NUT"]
+STAGE_SAMPLE = 100  # Badges drawn when timing single stages
+
+
+def synthetic_roster(count, seed=152):
+    """Deterministic roster mixing genders and name lengths, with some names long enough to shrink."""
+    rng = random.Random(seed)
+
+    def word(low, high):
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(low, high)))
+
+    roster = []
+    for _ in range(count):
+        gender = rng.choice("MF")
+        long_name = rng.random() < 0.15
+        surname = word(5, 8) if long_name else word(1, 3)
+        surname += "OV" if gender == "M" else "OVA"
+        first_name = word(4, 7) if long_name and rng.random() < 0.5 else word(1, 3)
+        roster.append({"name": f"{surname} {first_name}", "gender": gender})
+    return roster
+
+
+def new_badge_maker(output_pdf, **options):
+    from main import BadgeMaker, backside_template, font_path, template_men, template_women, text_color
+
+    # Some synthetic names are long enough to shrink below a legible size on purpose
+    return BadgeMaker(template_men, template_women, backside_template, font_path, output_pdf, text_color,
+                      verbose=False, min_font_points=None, **options)
+
+
+def timed(function, repeat):
+    """Mean and total seconds of calling function repeat times."""
+    start = time.perf_counter()
+    for idx in range(repeat):
+        function(idx)
+    total = time.perf_counter() - start
+    return {"calls": repeat, "total_s": round(total, 4), "mean_ms": round(1000 * total / repeat, 3)}
+
+
+def bench_stages(codec):
+    """Time create_badge, write_text_on_backside, arrange_badges_on_page and create_pdf one by one."""
+    from main import badge_size, group, page_size, template_men, template_women
+
+    roster = synthetic_roster(STAGE_SAMPLE)
+    with tempfile.TemporaryDirectory() as tmp:
+        badge_maker = new_badge_maker(os.path.join(tmp, "stages.pdf"), codec=codec)
+        badges = []
+
+        def create_badge(idx):
+            entry = roster[idx]
+            template_path = template_men if entry["gender"] == "M" else template_women
+            badges.append(badge_maker.create_badge(entry["name"], group, template_path, badge_size))
+
+        def write_text_on_backside(idx):
+            badge_maker.write_text_on_backside(group, "Al-Ebaa" if idx % 2 else "Hilton", "MAKKAH", badge_size)
+
+        per_page = badge_maker.layout(page_size, badge_size).per_page
+
+        def arrange_badges_on_page(idx):
+            page = badge_maker.arrange_badges_on_page(badges[idx * per_page:(idx + 1) * per_page], page_size,
+                                                      badge_size)
+            badge_maker.add_page(page)
+
+        pages = STAGE_SAMPLE // per_page
+        results = {
+            "create_badge": timed(create_badge, STAGE_SAMPLE),
+            "write_text_on_backside": timed(write_text_on_backside, STAGE_SAMPLE),
+            "arrange_badges_on_page": timed(arrange_badges_on_page, pages),
+            "create_pdf": timed(lambda idx: badge_maker.create_pdf(), 1),
+        }
+        results["create_pdf"]["pages"] = pages
+    return results
+
+
+def run_end_to_end(count, codec):
+    """Render a whole roster into a PDF; runs inside its own interpreter."""
+    from main import badge_size, group, page_size
+
+    roster = synthetic_roster(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        output_pdf = os.path.join(tmp, "end_to_end.pdf")
+        badge_maker = new_badge_maker(output_pdf, stream=True, codec=codec)
+        start = time.perf_counter()
+        badge_maker.process(roster, group, badge_size, page_size, "Al-Ebaa", "MAKKAH")
+        badge_maker.create_pdf()
+        seconds = time.perf_counter() - start
+        pdf_bytes = os.path.getsize(output_pdf)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+    return {
+        "names": count,
+        "pages": 2 * ((count + 8) // 9),
+        "total_s": round(seconds, 4),
+        "per_badge_ms": round(1000 * seconds / count, 3),
+        "pdf_kb": round(pdf_bytes / 1024, 1),
+        "peak_rss_mb": round(peak_mb, 1),
+    }
+
+
+def bench_end_to_end(count, codec):
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--job", str(count), "--codec", codec],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    """List figures that got worse than the baseline by more than threshold."""
+    regressions = []
+    for section, metric in (("stages", "mean_ms"), ("end_to_end", "total_s"), ("end_to_end", "peak_rss_mb")):
+        for name, current in results[section].items():
+            previous = baseline.get(section, {}).get(name)
+            if not previous or not previous.get(metric):
+                continue
+            change = current[metric] / previous[metric] - 1
+            if change > threshold:
+                regressions.append(f"{section}/{name} {metric}: {previous[metric]} -> {current[metric]} "
+                                   f"(+{change:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the badge pipeline on synthetic rosters.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="roster sizes to run end-to-end")
+    parser.add_argument("--codec", choices=CODECS, default="flate", help="page codec for create_pdf and end-to-end runs")
+    parser.add_argument("--output", default="benchmark_results.json", help="where to write the results")
+    parser.add_argument("--baseline", help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging, 0.10 = 10%%")
+    parser.add_argument("--job", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.output = os.path.abspath(args.output)
+    if args.baseline:
+        args.baseline = os.path.abspath(args.baseline)
+
+    os.chdir(ROOT)  # Templates and the font are looked up relative to the repository
+    if args.job:
+        print(json.dumps(run_end_to_end(args.job, args.codec)))
+        return 0
+
+    # Linux carries ru_maxrss across fork and exec, so the end-to-end runs go
+    # first, while this process is still small
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "codec": args.codec,
+        "end_to_end": {},
+    }
+    for count in args.sizes:
+        run = bench_end_to_end(count, args.codec)
+        results["end_to_end"][str(count)] = run
+        print(f"{count:>6} names {run['total_s']:>9.2f} s {run['per_badge_ms']:>8.1f} ms/badge "
+              f"{run['pdf_kb']:>10.0f} KB {run['peak_rss_mb']:>7.0f} MB peak")
+    results["stages"] = bench_stages(args.codec)
+    for name, stage in results["stages"].items():
+        print(f"{name:<24} {stage['mean_ms']:>10.2f} ms/call")
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results saved as {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
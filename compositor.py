@@ -0,0 +1,45 @@
+from PIL import Image
+
+WHITE = (255, 255, 255)
+
+
+class PageCompositor:
+    def __init__(self, page_size):
+        self.page_size = page_size
+        self.page = None  # Page buffer reused by compose(reuse=True)
+        self.dirty = []  # Slot boxes the last reused page drew into
+
+    @staticmethod
+    def is_opaque(badge):
+        return badge.mode != "RGBA" or badge.getchannel("A").getextrema()[0] == 255
+
+    def compose(self, badges, slots, reuse=False):
+        """Paste badges into their slots on a white RGB page; slots without a badge stay white.
+
+        With reuse, every call draws into the same page buffer, so the page is only valid until the next
+        compose; callers that keep pages must leave reuse off.
+        """
+        opaque = {}  # id(badge) -> bool, so a tile repeated across the page is checked once
+        tiles = []
+        for badge, slot in zip(badges, slots):
+            if id(badge) not in opaque:
+                opaque[id(badge)] = self.is_opaque(badge)
+            tiles.append((badge, slot + (slot[0] + badge.width, slot[1] + badge.height), opaque[id(badge)]))
+
+        if not reuse or self.page is None:
+            page = Image.new("RGB", self.page_size, WHITE)
+        else:
+            page = self.page
+            # Margins are never drawn on; only slots the last page used and no opaque tile covers again need clearing
+            covered = {box for _, box, is_opaque in tiles if is_opaque}
+            for box in self.dirty:
+                if box not in covered:
+                    page.paste(WHITE, box)
+        if reuse:
+            self.page = page
+            self.dirty = [box for _, box, _ in tiles]
+
+        for badge, box, is_opaque in tiles:
+            # Opaque tiles are a plain row copy; only real transparency pays for alpha blending
+            page.paste(badge, box[:2], None if is_opaque else badge)
+        return page
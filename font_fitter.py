@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+class FontFitter:
+    def __init__(self, font_path, max_fonts=64, max_sizes=8192):
+        self.font_path = font_path
+        self.max_fonts = max_fonts
+        self.max_sizes = max_sizes
+        self.fonts = OrderedDict()  # size -> FreeTypeFont, least recently used first
+        self.sizes = OrderedDict()  # (text, max_width, ratio, height) -> fitted size
+        self.draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))  # Measures text exactly like the badge draws
+        self.font_hits = 0
+        self.font_misses = 0
+        self.size_hits = 0
+        self.size_misses = 0
+        self.lock = threading.RLock()  # Batch runs share one fitter between threads
+
+    def font(self, size):
+        """Return the FreeType font at the given pixel size, loading it at most once."""
+        with self.lock:
+            font = self.fonts.get(size)
+            if font is not None:
+                self.font_hits += 1
+                self.fonts.move_to_end(size)
+                return font
+
+            self.font_misses += 1
+            font = ImageFont.truetype(self.font_path, size)
+            self.fonts[size] = font
+            if len(self.fonts) > self.max_fonts:
+                self.fonts.popitem(last=False)
+            return font
+
+    def text_width(self, text, size):
+        return self.measure(text, self.font(size))
+
+    def measure(self, text, font):
+        """Width of text drawn at the origin, the same as draw.textbbox((0, 0), ...)[2] on a badge."""
+        with self.lock:
+            return self.draw.textbbox((0, 0), text, font=font)[2]
+
+    def fit(self, text, max_width, font_size_ratio, badge_height):
+        """Find the largest font that fits the text within max_width."""
+        return self.font(self.fit_size(text, max_width, font_size_ratio, badge_height))
+
+    def fit_size(self, text, max_width, font_size_ratio, badge_height):
+        """Largest size up to badge_height * font_size_ratio whose text width fits max_width."""
+        with self.lock:
+            key = (text, max_width, font_size_ratio, badge_height)
+            size = self.sizes.get(key)
+            if size is not None:
+                self.size_hits += 1
+                self.sizes.move_to_end(key)
+                return size
+
+            self.size_misses += 1
+            size = self.search(text, max_width, int(badge_height * font_size_ratio))
+            self.sizes[key] = size
+            if len(self.sizes) > self.max_sizes:
+                self.sizes.popitem(last=False)
+            return size
+
+    def search(self, text, max_width, start_size):
+        # Text width grows monotonically with font size, so the answer is the
+        # boundary between sizes that fit (lo) and sizes that do not (hi).
+        start_width = self.text_width(text, start_size)
+        if start_width <= max_width:
+            return start_size
+
+        lo, hi = 0, start_size
+        # Width scales almost linearly with size, so one measurement lands
+        # next to the boundary and the bisection only has to settle it.
+        guess = start_size * max_width // start_width
+        if guess > 0:
+            if self.text_width(text, guess) <= max_width:
+                lo = guess
+                if guess + 1 < hi and self.text_width(text, guess + 1) > max_width:
+                    hi = guess + 1
+            else:
+                hi = guess
+
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self.text_width(text, mid) <= max_width:
+                lo = mid
+            else:
+                hi = mid
+        return lo
@@ -0,0 +1,75 @@
+from functools import lru_cache
+
+PAPERS = {"A4": (595, 842), "A3": (842, 1191), "Letter": (612, 792)}  # Sheet sizes in PDF points
+MARGINS = (0.04706, 0.02376)  # Left/right and top/bottom page margin as a fraction of the page
+GRID = (3, 3)  # Rows and columns of badges per sheet
+
+
+def sheet_sizes(scale, paper=PAPERS["A4"], grid=GRID, margins=MARGINS):
+    """Page and badge size in pixels for a sheet printed at scale pixels per PDF point."""
+    rows, cols = grid
+    x_margin, y_margin = margins
+    page_size = (int(paper[0] * scale), int(paper[1] * scale))
+    badge_width = int((1 - 2 * x_margin) * page_size[0] / cols)
+    badge_height = int((1 - 2 * y_margin) * page_size[1] / rows)
+    return page_size, (badge_width, badge_height)
+
+
+def parse_grid(text):
+    """Read a ROWSxCOLS grid such as 3x3 or 2x4."""
+    rows, sep, cols = text.lower().partition("x")
+    if not sep or not rows.isdigit() or not cols.isdigit() or int(rows) < 1 or int(cols) < 1:
+        raise ValueError(f"Grid must look like 3x3, got {text!r}")
+    return int(rows), int(cols)
+
+
+class BadgeGeometry:
+    def __init__(self, badge_size):
+        """Text boxes on one badge; every box is (x, y, max_width, font_ratio) in badge pixels."""
+        self.badge_size = badge_size
+        badge_width, badge_height = badge_size
+
+        # Ratios for text alignment based on W=484px, H=724px template
+        x_offset = int(badge_width * (45 / 484))  # Horizontal padding
+        max_text_width = int(badge_width * ((484 - 2 * 45) / 484))
+        self.surname = (x_offset, int(badge_height * (476 / 724)), max_text_width, 0.06)
+        self.first_name = (x_offset, int(badge_height * ((476 + 40) / 724)), max_text_width, 0.06)
+        self.group = (x_offset, int(badge_height * 0.92), max_text_width, 0.045)
+
+        # Backside runs are centred across the whole badge
+        self.destination = (0, int(badge_height * 0.02), badge_width, 0.045)
+        self.back_group = (0, int(badge_height * 0.92), badge_width, 0.045)
+        # 108px font and 184px padding on the 1069px tall print badge, as (font size, y)
+        self.hotel = (badge_height * 108 // 1069, badge_height * 184 // 1069)
+
+
+class Layout:
+    def __init__(self, page_size, badge_size, grid=GRID, margins=MARGINS, duplex=False):
+        """Slot corners for the fronts and backs of one sheet."""
+        self.page_size = page_size
+        self.badge_size = badge_size
+        self.rows, self.cols = grid
+        self.per_page = self.rows * self.cols
+
+        page_width, page_height = page_size
+        badge_width, badge_height = badge_size
+        x_padding = int(page_width * margins[0])
+        y_padding = int(page_height * margins[1])
+        self.slots = [(x_padding + col * badge_width, y_padding + row * badge_height)
+                      for row in range(self.rows) for col in range(self.cols)]
+        if duplex:
+            # Turned over on the long edge, the back of a badge sits at the mirrored x on the other side
+            self.back_slots = [(page_width - x - badge_width, y) for x, y in self.slots]
+        else:
+            self.back_slots = self.slots
+
+
+@lru_cache(maxsize=64)
+def badge_geometry(badge_size):
+    return BadgeGeometry(badge_size)
+
+
+@lru_cache(maxsize=64)
+def page_layout(page_size, badge_size, grid=GRID, margins=MARGINS, duplex=False):
+    """Layout shared by every page with the same sizes and grid."""
+    return Layout(page_size, badge_size, grid, margins, duplex)
@@ -1,210 +1,507 @@
+import argparse
 import time
 import itertools
+import multiprocessing
+import shutil
 import sys
-from PIL import Image, ImageDraw, ImageFont
-from fpdf import FPDF
+import tempfile
+from PIL import Image, ImageDraw
 import os
 
+from asset_pack import DEFAULT_PACK_DIR, AssetPack
+from compositor import PageCompositor
+from font_fitter import FontFitter
+from layout import GRID, MARGINS, PAPERS, BadgeGeometry, Layout, badge_geometry, page_layout, parse_grid, sheet_sizes
+import pdf_writer
+from pdf_writer import PdfWriter, merge_pdfs
+from preflight import MIN_FONT_POINTS, Preflight
+from profiler import Profiler
+from render_cache import RenderCache, code_fingerprint
+from template_cache import TemplateCache
+from text_runs import TextRunCache
+from vector_pdf import VectorPdfWriter
+
+
+TIERS = {"draft": 1, "proof": 2, "print": 4}  # Pixels per PDF point: quick proofs up to print resolution
+
 
 class BadgeMaker:
-    def __init__(self, template_men, template_women, backside_template, font_path, output_pdf, text_color):
+    def __init__(self, template_men, template_women, backside_template, font_path, output_pdf, text_color,
+                 stream=False, codec="flate", quality=90, compress_level=6, workers=1,
+                 templates=None, fonts=None, text_runs=None, verbose=True, cache_dir=None, vector=False, tier="print",
+                 paper="A4", grid=GRID, margins=MARGINS, duplex=False, asset_pack=None,
+                 min_font_points=MIN_FONT_POINTS):
         self.template_men = template_men
         self.template_women = template_women
         self.backside_template = backside_template
         self.font_path = font_path
         self.output_pdf = output_pdf
         self.text_color = text_color
+        self.verbose = verbose  # Print the progress spinner and summary lines
+        # Card stock: sheet size from PAPERS, rows and columns of badges, page margins as fractions of the page
+        self.paper = paper
+        self.grid = tuple(grid)
+        self.margins = tuple(margins)
+        self.duplex = duplex  # Mirror back page columns so each back lands behind its front when printed two-sided
+        self.min_font_points = min_font_points  # Preflight rejects names that would shrink below this printed size
+        self.tier = tier  # Resolution tier, see TIERS; page_size and badge_size are the sizes to pass to process
+        self.page_size, self.badge_size = tier_sizes(tier, paper, self.grid, self.margins)
+        self.workers = workers  # Processes rendering front pages; 1 renders in this process
+        # Write each page to the PDF as soon as it is composed instead of keeping self.pages; memory then grows
+        # with the compressed PDF rather than the page bitmaps, see PdfWriter.add_page
+        self.stream = stream
         self.pages = []
+        self.writer = None
+        self.parts = []  # Partial PDFs written by pool workers, merged into output_pdf by create_pdf
+        self.parts_dir = None
+        self.vector = vector  # Template images plus real PDF text instead of rasterized pages
+        self.vector_writer = None
+        # Page image encoding: raw "flate", "jpeg" (quality) or "png" (compress_level, same PDF as flate but slower)
+        self.writer_options = {"codec": codec, "quality": quality, "compress_level": compress_level}
+        self.page_width, self.page_height = PAPERS[paper]  # PDF page size in points
+        # Decoded templates and fitted fonts shared by every badge; pass existing caches to share them between runs
+        self.asset_pack = asset_pack  # Directory of pre-scaled templates mapped by every process, see asset_pack.py
+        self.templates = templates or TemplateCache(pack=AssetPack(asset_pack) if asset_pack else None)
+        self.fonts = fonts or FontFitter(font_path)
+        self.text_runs = text_runs or TextRunCache()  # Rasterized surnames, group labels and hotel names
+        self.back_pages = {}  # Memoized backside tiles and composed back pages
+        self.compositor = None  # Page compositor, created for the first page size used
+        self.cache_dir = cache_dir
+        # Rendered badges and front pages on disk, so a rebuild only re-draws what changed
+        self.render_cache = RenderCache(cache_dir) if cache_dir else None
+        self.profiler = Profiler()  # Per-stage timings and counters, see cache_counters and save_profile
 
     def get_scaled_font(self, draw, text, max_width, font_size_ratio, badge_height):
         """Find the largest font size that fits the text within the max_width."""
-        font_size = int(badge_height * font_size_ratio)  # Font size as a ratio of badge height
-        font = ImageFont.truetype(self.font_path, font_size)
-        while draw.textbbox((0, 0), text, font=font)[2] > max_width:  # textbbox returns the text's width
-            font_size -= 1
-            font = ImageFont.truetype(self.font_path, font_size)
-        return font
+        return self.fonts.fit(text, max_width, font_size_ratio, badge_height)
 
-    def create_badge(self, name, group, template_path, badge_size):
-        """Create a single badge with dynamically scaled text."""
-        badge_width, badge_height = badge_size
-        template = Image.open(template_path).convert("RGBA").resize(badge_size)
-        draw = ImageDraw.Draw(template)
+    def badge_text(self, name, group, badge_size):
+        """Lay out surname, first name and group on a badge as (text, font, (x, y), fill) runs."""
+        geometry = badge_geometry(tuple(badge_size))
 
         # Split into surname and name
         surname, first_name = name.split(maxsplit=1)
 
-        # Ratios for text alignment based on W=484px, H=724px template
-        x_ratio = 45 / 484  # Horizontal padding ratio
-        surname_y_ratio = 476 / 724  # Surname Y position ratio
-        name_y_ratio = (476 + 40) / 724  # Name Y position ratio (adjusted for spacing)
-        group_y_ratio = 0.92  # Group Y position ratio
-        max_text_width_ratio = (484 - 2 * 45) / 484  # Max text width ratio
-
-        # Convert ratios to pixel values for current badge size
-        x_offset = int(badge_width * x_ratio)
-        max_text_width = int(badge_width * max_text_width_ratio)
-        surname_y = int(badge_height * surname_y_ratio)
-        name_y = int(badge_height * name_y_ratio)
-        group_y = int(badge_height * group_y_ratio)
-
-        # Text size ratios (relative to badge height)
-        surname_font_ratio = 0.06  # Surname font size
-        name_font_ratio = 0.06     # Name font size
-        group_font_ratio = 0.045   # Group font size
-
-        # Get dynamically scaled fonts
-        font_surname = self.get_scaled_font(draw, surname, max_text_width, surname_font_ratio, badge_height)
-        font_first_name = self.get_scaled_font(draw, first_name, max_text_width, name_font_ratio, badge_height)
-        font_group = self.get_scaled_font(draw, group, max_text_width, group_font_ratio, badge_height)
-
-        # Draw surname
-        surname_width, surname_height = draw.textbbox((0, 0), surname, font=font_surname)[2:]
-        surname_x = x_offset + (max_text_width - surname_width) // 2
-        draw.text((surname_x, surname_y), surname, font=font_surname, fill=self.text_color)
-
-        # Draw first name
-        first_name_width, first_name_height = draw.textbbox((0, 0), first_name, font=font_first_name)[2:]
-        first_name_x = x_offset + (max_text_width - first_name_width) // 2
-        draw.text((first_name_x, name_y), first_name, font=font_first_name, fill=self.text_color)
-
-        # Draw group
-        group_width, group_height = draw.textbbox((0, 0), group, font=font_group)[2:]
-        group_x = x_offset + (max_text_width - group_width) // 2
-        draw.text((group_x, group_y), group, font=font_group, fill=self.text_color)
+        runs = []
+        for text, (x_offset, y, max_text_width, font_ratio) in ((surname, geometry.surname),
+                                                                (first_name, geometry.first_name),
+                                                                (group, geometry.group)):
+            # Dynamically scaled font, centred within the text box
+            font = self.fonts.fit(text, max_text_width, font_ratio, badge_size[1])
+            x = x_offset + (max_text_width - self.fonts.measure(text, font)) // 2
+            runs.append((text, font, (x, y), self.text_color))
+        return runs
 
+    def create_badge(self, name, group, template_path, badge_size):
+        """Create a single badge with dynamically scaled text."""
+        with self.profiler.stage("template_load"):
+            template = self.templates.get(template_path, badge_size)
+        with self.profiler.stage("font_fitting"):
+            runs = self.badge_text(name, group, badge_size)
+        with self.profiler.stage("text_drawing"):
+            draw = ImageDraw.Draw(template)
+            for text, font, xy, fill in runs:
+                self.text_runs.draw(draw, xy, text, font, fill)
         return template
 
-    def write_text_on_backside(self, group, hotel_name, destination, badge_size):
-        """Write text on the backside template."""
-        badge_width, badge_height = badge_size
+    def backside_path(self, hotel_name):
+        """Use specific hotel backside template if available, otherwise default to backside.png."""
         backside_path = f"{hotel_name}.png"
+        return backside_path if os.path.exists(backside_path) else self.backside_template
 
-        # Use specific hotel backside template if available, otherwise default to backside.png
-        if os.path.exists(backside_path):
-            template = Image.open(backside_path).convert("RGBA").resize(badge_size)
-
-            draw = ImageDraw.Draw(template)
-        else:
-            template = Image.open(self.backside_template).convert("RGBA").resize(badge_size)
+    def backside_text(self, group, hotel_name, destination, badge_size):
+        """Lay out the backside text as (text, font, (x, y), fill) runs."""
+        geometry = badge_geometry(tuple(badge_size))
+        badge_width, badge_height = badge_size
+        runs = []
+
+        if self.backside_path(hotel_name) == self.backside_template:
+            # Write Hotel Name (e.g., "Hilton") on the generic backside
+            hotel_size, hotel_y = geometry.hotel
+            hotel_font = self.fonts.font(hotel_size)
+            hotel_x = (badge_width - self.fonts.measure(hotel_name, hotel_font)) // 2
+            runs.append((hotel_name, hotel_font, (hotel_x, hotel_y), "#FFFFFF"))
+
+        # Destination (e.g., "Makkah") near the top, group name near the bottom
+        for text, (x_offset, y, max_text_width, font_ratio) in ((destination, geometry.destination),
+                                                                (group, geometry.back_group)):
+            font = self.fonts.fit(text, max_text_width, font_ratio, badge_height)
+            x = x_offset + (max_text_width - self.fonts.measure(text, font)) // 2
+            runs.append((text, font, (x, y), "#EFDBC7"))
+        return runs
 
+    def write_text_on_backside(self, group, hotel_name, destination, badge_size):
+        """Write text on the backside template."""
+        with self.profiler.stage("template_load"):
+            template = self.templates.get(self.backside_path(hotel_name), badge_size)
+        with self.profiler.stage("font_fitting"):
+            runs = self.backside_text(group, hotel_name, destination, badge_size)
+        with self.profiler.stage("text_drawing"):
             draw = ImageDraw.Draw(template)
-
-            # Write Hotel Name (e.g., "Hilton")
-            hotel_font = ImageFont.truetype(self.font_path, 108)  # Larger font size
-            hotel_y = 184  # Padding from top
-            hotel_width = draw.textbbox((0, 0), hotel_name, font=hotel_font)[2]
-            hotel_x = (badge_width - hotel_width) // 2
-            draw.text((hotel_x, hotel_y), hotel_name, font=hotel_font, fill="#FFFFFF")
-
-        # Write Destination (e.g., "Makkah") near the top
-        destination_font = self.get_scaled_font(draw, destination, badge_width, 0.045, badge_height)
-        destination_y_ratio = 0.02  # Start from the top with a ratio
-        destination_y = int(badge_height * destination_y_ratio)
-        destination_width = draw.textbbox((0, 0), destination, font=destination_font)[2]
-        destination_x = (badge_width - destination_width) // 2
-        draw.text((destination_x, destination_y), destination, font=destination_font, fill="#EFDBC7")
-
-        # Write Group Name near the bottom
-        group_font = self.get_scaled_font(draw, group, badge_width, 0.045, badge_height)
-        group_y_ratio = 0.92
-        group_y = int(badge_height * group_y_ratio)
-        group_width = draw.textbbox((0, 0), group, font=group_font)[2]
-        group_x = (badge_width - group_width) // 2
-        draw.text((group_x, group_y), group, font=group_font, fill="#EFDBC7")
-
+            for text, font, xy, fill in runs:
+                self.text_runs.draw(draw, xy, text, font, fill)
         return template
 
+    def layout(self, page_size, badge_size):
+        """Slots for this sheet, computed once per page size, badge size and grid."""
+        return page_layout(tuple(page_size), tuple(badge_size), self.grid, self.margins, self.duplex)
 
+    def slot_positions(self, page_size, badge_size, back=False):
+        """Top-left pixel corner of each badge slot in the page grid; backs are mirrored for duplex printing."""
+        layout = self.layout(page_size, badge_size)
+        return layout.back_slots if back else layout.slots
 
-
-    def arrange_badges_on_page(self, badges, page_size, badge_size):
-        """Arrange badges in a grid layout on an A4 page."""
-        rows, cols = 3, 3
-        x_padding_ratio, y_padding_ratio = 0.04706, 0.02376
-        page = Image.new("RGBA", page_size, (255, 255, 255, 255))
-
-        page_width, page_height = page_size
-        x_padding = int(page_width * x_padding_ratio)
-        y_padding = int(page_height * y_padding_ratio)
-
-        badge_width, badge_height = badge_size
-        for idx, badge in enumerate(badges):
-            row = idx // cols
-            col = idx % cols
-            if row >= rows:
-                break
-            x = x_padding + col * badge_width
-            y = y_padding + row * badge_height
-            page.paste(badge, (x, y), badge)
+    def arrange_badges_on_page(self, badges, page_size, badge_size, back=False, reuse=False):
+        """Arrange badges in a grid layout on a page; with reuse the page is overwritten by the next call."""
+        with self.profiler.stage("page_compositing"):
+            if self.compositor is None or self.compositor.page_size != page_size:
+                self.compositor = PageCompositor(page_size)
+            page = self.compositor.compose(badges, self.slot_positions(page_size, badge_size, back), reuse)
 
         return page
 
+    def get_back_page(self, group, hotel_name, destination, badge_size, page_size):
+        """Return the back page, rendering its tile and composing it once per template version."""
+        mtime = os.path.getmtime(self.backside_path(hotel_name))
+        key = (group, hotel_name, destination, badge_size, page_size, mtime)
+        back_page = self.back_pages.get(key)
+        if back_page is None:
+            backside = self.write_text_on_backside(group, hotel_name, destination, badge_size)
+            per_page = self.layout(page_size, badge_size).per_page
+            back_page = self.arrange_badges_on_page([backside] * per_page, page_size, badge_size, back=True)
+            self.back_pages[key] = back_page
+        return back_page
+
+    def add_page(self, page, shared=False):
+        """Hand a composed page to the PDF writer in streaming mode, otherwise keep it for create_pdf."""
+        if not self.stream:
+            self.pages.append(page)
+            return
+        if self.writer is None:
+            self.writer = PdfWriter(self.output_pdf, self.page_width, self.page_height, profiler=self.profiler,
+                                    **self.writer_options)
+        self.writer.add_page(page, shared)
+
     def create_pdf(self):
         """Save pages as a single PDF."""
-        pdf = FPDF(unit="pt", format="A4")
+        if self.vector_writer:
+            self.vector_writer.close()
+            self.vector_writer = None
+            if self.verbose:
+                print(f"PDF saved as {self.output_pdf}")
+            return
+
+        if self.parts:
+            with self.profiler.stage("pdf_merge"):
+                merge_pdfs(self.parts, self.output_pdf)
+            shutil.rmtree(self.parts_dir)
+            self.parts = []
+            self.parts_dir = None
+            if self.verbose:
+                print(f"PDF saved as {self.output_pdf}")
+            return
+
+        writer = self.writer or PdfWriter(self.output_pdf, self.page_width, self.page_height, profiler=self.profiler,
+                                    **self.writer_options)
+        back_pages = self.back_pages.values()
+        for page in self.pages:
+            writer.add_page(page, shared=any(page is back_page for back_page in back_pages))
+        writer.close()
+        self.writer = None
+        self.pages = []
+        if self.verbose:
+            print(f"PDF saved as {self.output_pdf}")
+
+    def badge_cache_key(self, entry, group, badge_size):
+        """Hash of everything create_badge draws from for one passenger."""
+        cache = self.render_cache
+        template_path = self.template_men if entry["gender"] == "M" else self.template_women
+        return cache.key("badge", entry["name"], entry["gender"], group, cache.file_digest(template_path),
+                         cache.file_digest(self.font_path), self.text_color, badge_size, BADGE_LAYOUT)
+
+    def render_front_page(self, entries, group, badge_size, page_size, reuse=False):
+        """Render up to a page of badges and arrange them on a front page, leaving unused slots blank.
+
+        With reuse the page is drawn into the compositor's buffer; encode it before rendering the next one.
+        """
+        cache = self.render_cache
+        if cache:
+            badge_keys = [self.badge_cache_key(entry, group, badge_size) for entry in entries]
+            page_key = cache.key("page", badge_keys, badge_size, page_size, self.grid, self.margins, PAGE_LAYOUT)
+            with self.profiler.stage("render_cache"):
+                page = cache.get("page", page_key)
+            if page is not None:
+                return page
+
+        batch = []
+        for idx, entry in enumerate(entries):
+            badge = None
+            if cache:
+                with self.profiler.stage("render_cache"):
+                    badge = cache.get("badge", badge_keys[idx])
+            if badge is None:
+                name = entry["name"]
+                gender = entry["gender"]
+                template_path = self.template_men if gender == "M" else self.template_women
+                badge = self.create_badge(name, group, template_path, badge_size)
+                if cache:
+                    with self.profiler.stage("render_cache"):
+                        cache.put(badge_keys[idx], badge)
+            batch.append(badge)
+
+        # Slots past the last passenger stay blank
+        page = self.arrange_badges_on_page(batch, page_size, badge_size, reuse=reuse)
+        if cache:
+            with self.profiler.stage("render_cache"):
+                cache.put(page_key, page)
+        return page
+
+    def prepare_assets(self, badge_size, hotel_name=None):
+        """Bring the template pack up to date once, before worker processes start mapping it."""
+        if self.templates.pack is None:
+            return
+        paths = [self.template_men, self.template_women]
+        if hotel_name is not None:
+            paths.append(self.backside_path(hotel_name))
+        self.templates.pack.ensure(paths, badge_size)
+
+    def render_front_pages(self, names_with_gender, group, badge_size, page_size):
+        """Yield front pages in page order, rendered here or across a process pool."""
+        per_page = self.layout(page_size, badge_size).per_page
+        jobs = [(names_with_gender[i:i + per_page], group, badge_size, page_size)
+                for i in range(0, len(names_with_gender), per_page)]
+        if self.workers <= 1 or len(jobs) <= 1:
+            for job in jobs:
+                # A streamed page is in the PDF before the next one is rendered, so they can share one buffer
+                yield self.render_front_page(*job, reuse=self.stream)
+            return
+
+        self.prepare_assets(badge_size)
+        with multiprocessing.Pool(min(self.workers, len(jobs)), init_worker, (self.worker_config(),)) as pool:
+            for page, profile in pool.imap(render_front_page_in_worker, jobs):
+                self.profiler.merge(profile)
+                yield page
+
+    def worker_config(self):
+        """BadgeMaker arguments for pool workers; each worker loads its own fonts and templates."""
+        return {
+            "template_men": self.template_men,
+            "template_women": self.template_women,
+            "backside_template": self.backside_template,
+            "font_path": self.font_path,
+            "text_color": self.text_color,
+            "cache_dir": self.cache_dir,
+            "asset_pack": self.asset_pack,
+            "paper": self.paper,
+            "grid": self.grid,
+            "margins": self.margins,
+            "duplex": self.duplex,
+            **self.writer_options,
+        }
+
+    def write_part(self, output_pdf, names_with_gender, group, badge_size, page_size, hotel_name, destination):
+        """Write the front and back pages of one page range to a partial PDF."""
+        writer = PdfWriter(output_pdf, self.page_width, self.page_height, profiler=self.profiler, **self.writer_options)
+        per_page = self.layout(page_size, badge_size).per_page
+        for i in range(0, len(names_with_gender), per_page):
+            writer.add_page(self.render_front_page(names_with_gender[i:i + per_page], group, badge_size, page_size,
+                                                   reuse=True))
+            writer.add_page(self.get_back_page(group, hotel_name, destination, badge_size, page_size), shared=True)
+        writer.close()
+
+    def process_parts(self, names_with_gender, group, badge_size, page_size, hotel_name, destination):
+        """Encode page ranges into partial PDFs across the process pool; create_pdf merges them in order."""
+        if self.parts_dir is None:
+            self.parts_dir = tempfile.mkdtemp(prefix="badges-")
+        per_page = self.layout(page_size, badge_size).per_page
+        total_batches = -(-len(names_with_gender) // per_page)
+        names_per_part = per_page * -(-total_batches // self.workers)  # One page range per worker
+        jobs = []
+        for i in range(0, len(names_with_gender), names_per_part):
+            part = os.path.join(self.parts_dir, f"part{len(self.parts) + len(jobs):05d}.pdf")
+            jobs.append((part, names_with_gender[i:i + names_per_part], group, badge_size, page_size, hotel_name,
+                         destination))
+
+        self.prepare_assets(badge_size, hotel_name)
+        with multiprocessing.Pool(min(self.workers, len(jobs)), init_worker, (self.worker_config(),)) as pool:
+            for job, (part, profile) in zip(jobs, pool.imap(write_part_in_worker, jobs)):
+                self.profiler.merge(profile)
+                self.profiler.count("pages", 2 * -(-len(job[1]) // per_page))
+                self.parts.append(part)
+                if self.verbose:
+                    sys.stdout.write(f"\rEncoded part {len(self.parts)}/{len(jobs)} ({total_batches} batches)")
+                    sys.stdout.flush()
+        if self.verbose:
+            print("\nAll batches processed successfully!")
+
+    def cache_counters(self):
+        """Hit and miss counters of every cache used in this process."""
+        counters = {
+            "templates_hits": self.templates.hits,
+            "templates_misses": self.templates.misses,
+            "fonts_hits": self.fonts.font_hits,
+            "fonts_misses": self.fonts.font_misses,
+            "font_sizes_hits": self.fonts.size_hits,
+            "font_sizes_misses": self.fonts.size_misses,
+            "text_runs_hits": self.text_runs.hits,
+            "text_runs_misses": self.text_runs.misses,
+        }
+        if self.templates.pack is not None:
+            pack = self.templates.pack
+            counters.update({"asset_pack_hits": pack.hits, "asset_pack_misses": pack.misses})
+        if self.render_cache:
+            counters.update({f"render_{name}": value for name, value in self.render_cache.counts.items()})
+        return counters
+
+    def render_cache_counts(self):
+        """Render cache hits and misses here and in pool workers (badge_hits, page_misses, ...)."""
+        if not self.render_cache:
+            return {}
+        return {name: value + self.profiler.counters.get(f"render_{name}", 0)
+                for name, value in self.render_cache.counts.items()}
+
+    def save_render_stats(self):
+        """Record every render cache hit and miss of this BadgeMaker as the cache's last run."""
+        if self.render_cache:
+            self.render_cache.save_stats(self.render_cache_counts())
+
+    def save_contact_sheet(self, path, columns=4):
+        """Tile the kept pages, fronts and backs in order, into one PNG for proofing."""
+        if not self.pages:
+            raise ValueError("No pages to put on a contact sheet; render without stream=True first")
+        columns = min(columns, len(self.pages))
+        page_width, page_height = self.pages[0].size
+        gap = max(1, page_width // 50)
+        rows = (len(self.pages) + columns - 1) // columns
+        sheet_size = (columns * (page_width + gap) + gap, rows * (page_height + gap) + gap)
+        sheet = Image.new("RGB", sheet_size, (128, 128, 128))
         for idx, page in enumerate(self.pages):
-            temp_path = f"temp_page_{idx}.png"
-            page.save(temp_path, "PNG")
-            pdf.add_page()
-            pdf.image(temp_path, 0, 0, 595, 842)
-            os.remove(temp_path)
-        pdf.output(self.output_pdf)
-        print(f"PDF saved as {self.output_pdf}")
+            row, col = divmod(idx, columns)
+            sheet.paste(page, (gap + col * (page_width + gap), gap + row * (page_height + gap)))
+        sheet.save(path, "PNG", compress_level=1)  # A proof is looked at once, so favour speed over size
+        if self.verbose:
+            print(f"Contact sheet saved as {path}")
+
+    def save_profile(self, path, **extra):
+        """Write the per-stage timing and cache report as JSON."""
+        return self.profiler.save(path, self.cache_counters(), output_pdf=self.output_pdf, **extra)
+
+    def process_vector(self, names_with_gender, group, badge_size, page_size, hotel_name, destination):
+        """Lay out pages as embedded template images with the names as real PDF text."""
+        if self.vector_writer is None:
+            self.vector_writer = VectorPdfWriter(self, self.output_pdf, page_size, badge_size, self.page_width,
+                                                 self.page_height)
+        per_page = self.layout(page_size, badge_size).per_page
+        for i in range(0, len(names_with_gender), per_page):
+            self.vector_writer.add_front_page(names_with_gender[i:i + per_page], group)
+            self.vector_writer.add_back_page(group, hotel_name, destination)
+            self.profiler.count("pages", 2)
+        if self.verbose:
+            print(f"Laid out {self.vector_writer.page_count} vector pages")
+
+    def check_roster(self, names_with_gender, group, hotel_name, destination):
+        """Run every preflight check without raising; legibility is judged on the print tier's badge."""
+        # Low tiers round font sizes down to whole pixels, which would refuse draft proofs of names that print fine
+        page_size, badge_size = tier_sizes("print", self.paper, self.grid, self.margins)
+        with self.profiler.stage("preflight"):
+            checks = Preflight(self, badge_size, page_size, self.min_font_points)
+            return checks.check(names_with_gender, group, hotel_name, destination)
+
+    def preflight(self, names_with_gender, group, hotel_name, destination):
+        """Check the roster and assets before rendering anything; raises PreflightError listing every problem."""
+        checks = self.check_roster(names_with_gender, group, hotel_name, destination)
+        if self.verbose:
+            for note in checks.notes:
+                print(f"Note: {note}")
+        checks.raise_problems()
+        return checks
 
     def process(self, names_with_gender, group, badge_size, page_size, hotel_name, destination):
         """Main processing logic with ETA and loading animation."""
-        badges = []
+        self.preflight(names_with_gender, group, hotel_name, destination)
+        if self.vector:
+            self.process_vector(names_with_gender, group, badge_size, page_size, hotel_name, destination)
+            return
+
+        # Large streamed runs encode whole page ranges in parallel instead of feeding one writer page by page
+        parallel = self.stream and self.workers > 1 and pdf_writer.pypdf is not None and self.writer is None
+        per_page = self.layout(page_size, badge_size).per_page
+        if self.parts or (parallel and len(names_with_gender) > per_page):
+            self.process_parts(names_with_gender, group, badge_size, page_size, hotel_name, destination)
+            return
+
         total_names = len(names_with_gender)
-        total_batches = (total_names + 8) // 9  # Number of batches (9 badges per page)
+        total_batches = -(-total_names // per_page)  # Number of batches (one page of badges each)
         processed_batches = 0
-        time_taken = 0
         spinner = itertools.cycle(["|", "/", "-", "\\"])  # Spinner animation
 
-        for entry in names_with_gender:
-            name = entry["name"]
-            gender = entry["gender"]
-            template_path = self.template_men if gender == "M" else self.template_women
-            badge = self.create_badge(name, group, template_path, badge_size)
-            badges.append(badge)
-
-        for i in range(0, len(badges), 9):
-            batch = badges[i:i + 9]
-            start_time = time.time()  # Start timing this batch
-
-            if len(batch) < 9:
-                while len(batch) < 9:
-                    blank_badge = Image.new("RGBA", badge_size, (255, 255, 255, 255))
-                    batch.append(blank_badge)
-
+        page_start = time.perf_counter()
+        for front_page in self.render_front_pages(names_with_gender, group, badge_size, page_size):
             # Simulate processing with animation
-            sys.stdout.write("\r")  # Return cursor to the start of the line
-            sys.stdout.write(
-                f"Processing batch {processed_batches + 1}/{total_batches} {next(spinner)}"
-            )
-            sys.stdout.flush()
+            if self.verbose:
+                sys.stdout.write("\r")  # Return cursor to the start of the line
+                sys.stdout.write(
+                    f"Processing batch {processed_batches + 1}/{total_batches} {next(spinner)}"
+                )
+                sys.stdout.flush()
 
-            front_page = self.arrange_badges_on_page(batch, page_size, badge_size)
-            self.pages.append(front_page)
+            self.add_page(front_page)
+            del front_page  # A streamed page lives on only as the compositor's buffer once it is in the PDF
 
-            backside_batch = [self.write_text_on_backside(group, hotel_name, destination, badge_size) for _ in batch]
-            back_page = self.arrange_badges_on_page(backside_batch, page_size, badge_size)
-            self.pages.append(back_page)
+            back_page = self.get_back_page(group, hotel_name, destination, badge_size, page_size)
+            self.add_page(back_page, shared=True)
+            self.profiler.count("pages", 2)
 
-            # Update processed batches and calculate ETA
+            # Update processed batches and calculate ETA from the measured time per page
             processed_batches += 1
-            time_taken += time.time() - start_time
-            avg_time_per_batch = time_taken / processed_batches
+            now = time.perf_counter()
+            self.profiler.lap("page", now - page_start)
+            page_start = now
             remaining_batches = total_batches - processed_batches
-            eta = avg_time_per_batch * remaining_batches
+            eta = self.profiler.mean_lap("page") * remaining_batches
 
             # Display progress and ETA
-            sys.stdout.write(
-                f" | ETA: {int(eta)} seconds remaining..."
-            )
-            sys.stdout.flush()
+            if self.verbose:
+                sys.stdout.write(
+                    f" | ETA: {int(eta)} seconds remaining (most time in {self.profiler.busiest()})..."
+                )
+                sys.stdout.flush()
+
+        if self.verbose:
+            print("\nAll batches processed successfully!")  # New line after completion
+
 
-        print("\nAll batches processed successfully!")  # New line after completion
+def tier_sizes(tier, paper="A4", grid=GRID, margins=MARGINS):
+    """Page and badge size in pixels for a resolution tier; every layout ratio is the same in all tiers."""
+    if tier not in TIERS:
+        raise ValueError(f"Unknown resolution tier {tier!r}, expected one of {', '.join(TIERS)}")
+    return sheet_sizes(TIERS[tier], PAPERS[paper], grid, margins)
+
+
+# Layout fingerprints: editing the drawing code or its ratios invalidates cached badges and pages
+BADGE_LAYOUT = code_fingerprint(BadgeMaker.create_badge, BadgeMaker.badge_text, BadgeGeometry.__init__)
+PAGE_LAYOUT = code_fingerprint(BadgeMaker.arrange_badges_on_page, BadgeMaker.slot_positions,
+                               BadgeMaker.render_front_page, PageCompositor.compose, PageCompositor.is_opaque,
+                               Layout.__init__)
+
+worker_badge_maker = None  # Per-process BadgeMaker whose fonts and templates stay loaded between pages
+
+
+def init_worker(config):
+    global worker_badge_maker
+    worker_badge_maker = BadgeMaker(output_pdf=None, verbose=False, **config)
+
+
+def render_front_page_in_worker(job):
+    """Render one front page and hand the worker's stage timings and cache hits back with it."""
+    page = worker_badge_maker.render_front_page(*job)
+    return page, worker_badge_maker.profiler.take(worker_badge_maker.cache_counters())
+
+
+def write_part_in_worker(job):
+    """Write one partial PDF and hand the worker's stage timings and cache hits back with its path."""
+    worker_badge_maker.write_part(*job)
+    return job[0], worker_badge_maker.profiler.take(worker_badge_maker.cache_counters())
 
 
 # Input Data
@@ -232,15 +529,35 @@ font_path = "Unbounded-Bold.ttf"
 text_color = (239, 219, 199)
 
 # Badge and Page Sizes
-a4_width, a4_height = 595, 842
-page_size = (int(a4_width * 4), int(a4_height * 4))
-badge_width = int((1 - 2 * 0.04706) * page_size[0] / 3)
-badge_height = int((1 - 2 * 0.02376) * page_size[1] / 3)
-badge_size = (badge_width, badge_height)
-
-# Instantiate and Run
-badge_maker = BadgeMaker(template_men, template_women, backside_template, font_path, output_pdf, text_color)
-# Process badges with backside text
-badge_maker.process(names_with_gender, group, badge_size, page_size, "Al-Ebaa", "MAKKAH")
-badge_maker.create_pdf()
-
+page_size, badge_size = tier_sizes("print")
+badge_width, badge_height = badge_size
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Build {output_pdf} from the roster in main.py.")
+    parser.add_argument("--tier", choices=TIERS, default="print",
+                        help="resolution: draft (1x) and proof (2x) for quick checks, print (4x) for the final PDF")
+    parser.add_argument("--paper", choices=PAPERS, default="A4", help="sheet size")
+    parser.add_argument("--grid", type=parse_grid, default=GRID, metavar="ROWSxCOLS",
+                        help="badges per sheet (default: 3x3)")
+    parser.add_argument("--duplex", action="store_true", help="mirror back page columns for two-sided printing")
+    parser.add_argument("--contact-sheet", metavar="PNG", help="write all pages to one PNG instead of the PDF")
+    parser.add_argument("--profile", nargs="?", const="profile.json", metavar="PATH",
+                        help="write per-stage timings and cache hit rates as JSON (default: profile.json)")
+    args = parser.parse_args()
+    if args.tier != "print":
+        output_pdf = output_pdf.replace(".pdf", f"-{args.tier}.pdf")  # Keep the print PDF next to the proofs
+
+    # Instantiate and Run
+    badge_maker = BadgeMaker(template_men, template_women, backside_template, font_path, output_pdf, text_color,
+                             stream=not args.contact_sheet, cache_dir=".badge_cache", tier=args.tier,
+                             paper=args.paper, grid=args.grid, duplex=args.duplex, asset_pack=DEFAULT_PACK_DIR)
+    # Process badges with backside text
+    badge_maker.process(names_with_gender, group, badge_maker.badge_size, badge_maker.page_size, "Al-Ebaa", "MAKKAH")
+    if args.contact_sheet:
+        badge_maker.save_contact_sheet(args.contact_sheet)
+    else:
+        badge_maker.create_pdf()
+    badge_maker.save_render_stats()
+    if args.profile:
+        badge_maker.save_profile(args.profile)
+        print(f"Profile saved as {args.profile}")
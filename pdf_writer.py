@@ -0,0 +1,92 @@
+from io import BytesIO
+
+from fpdf import FPDF
+from PIL import Image
+
+from profiler import Profiler
+
+try:
+    import pypdf
+except ImportError:  # Chunked assembly needs pypdf; without it one PdfWriter writes every page
+    pypdf = None
+
+CODECS = ("png", "jpeg", "flate")
+
+
+class PdfWriter:
+    def __init__(self, output_pdf, page_width=595, page_height=842, codec="flate", quality=90, compress_level=6,
+                 profiler=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown page codec {codec!r}, expected one of {', '.join(CODECS)}")
+        self.output_pdf = output_pdf
+        self.page_width = page_width
+        self.page_height = page_height
+        self.codec = codec
+        self.quality = quality  # JPEG quality
+        # PNG zlib level; FPDF decodes the PNG and deflates the pixels again, so it changes encode time, never PDF size
+        self.compress_level = compress_level
+        self.profiler = profiler or Profiler()
+        self.pdf = FPDF(unit="pt", format=(page_width, page_height))
+        self.shared = {}  # id(page) -> (page, encoded image) for pages repeated across the document
+        self.page_count = 0
+
+    def encode(self, page):
+        """Encode a page bitmap in memory in a form FPDF can embed."""
+        if self.codec == "png":
+            buffer = BytesIO()
+            page.save(buffer, "PNG", compress_level=self.compress_level)
+            return buffer
+        page = self.flatten(page)
+        if self.codec == "jpeg":
+            buffer = BytesIO()
+            page.save(buffer, "JPEG", quality=self.quality)
+            return buffer  # Embedded as-is with DCTDecode
+        return page  # FPDF deflates raw pixels itself
+
+    @staticmethod
+    def flatten(page):
+        """Composite a page onto white and drop the alpha channel."""
+        if page.mode == "RGB":
+            return page
+        if page.mode != "RGBA":
+            return page.convert("RGB")
+        flat = Image.new("RGB", page.size, (255, 255, 255))
+        flat.paste(page, mask=page.getchannel("A"))
+        return flat
+
+    def add_page(self, page, shared=False):
+        """Embed a composed page bitmap; the caller may drop the bitmap afterwards.
+
+        FPDF keeps every page's compressed image until close writes the file, so memory still grows by
+        about the compressed size of each page (roughly the finished PDF's size), just not by its bitmap.
+        Writing partial PDFs and merging them does not bound it: pypdf holds every part while merging.
+        """
+        entry = self.shared.get(id(page)) if shared else None
+        # FPDF caches images by content hash, so a repeated page reuses the XObject already embedded
+        if entry:
+            image = entry[1]
+        else:
+            with self.profiler.stage("image_encoding"):
+                image = self.encode(page)
+            if shared:
+                self.shared[id(page)] = (page, image)
+        with self.profiler.stage("pdf_embed"):  # FPDF deflates png and flate pages here
+            self.pdf.add_page()
+            self.pdf.image(image, 0, 0, self.page_width, self.page_height)
+        self.page_count += 1
+
+    def close(self):
+        """Write the finished document to output_pdf."""
+        with self.profiler.stage("pdf_write"):
+            self.pdf.output(self.output_pdf)
+        self.shared.clear()
+
+
+def merge_pdfs(parts, output_pdf):
+    """Concatenate partial PDFs into output_pdf without re-encoding, keeping one copy of identical images."""
+    merged = pypdf.PdfWriter()
+    for part in parts:
+        merged.append(part)
+    # Every part embeds the same back page; collapse the copies into one XObject
+    merged.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+    merged.write(output_pdf)
@@ -0,0 +1,112 @@
+import math
+import os
+from functools import lru_cache
+
+from fontTools.ttLib import TTFont
+
+from layout import badge_geometry
+
+GENDERS = ("M", "F")
+MIN_FONT_POINTS = 6  # Smallest printed text size that still reads on a badge
+
+
+class PreflightError(ValueError):
+    def __init__(self, problems):
+        super().__init__(f"{len(problems)} problem(s) found before rendering:\n"
+                         + "\n".join(f"  - {problem}" for problem in problems))
+        self.problems = problems
+
+
+@lru_cache(maxsize=8)
+def font_charset(font_path):
+    """Code points the font has a glyph for."""
+    return frozenset(TTFont(font_path, lazy=True).getBestCmap())
+
+
+class Preflight:
+    def __init__(self, badge_maker, badge_size, page_size, min_points=MIN_FONT_POINTS):
+        self.badge_maker = badge_maker
+        self.badge_size = tuple(badge_size)
+        self.geometry = badge_geometry(self.badge_size)
+        self.charset = font_charset(badge_maker.font_path)
+        # Pixel size of min_points on these pages, the print tier's for BadgeMaker; no min_points skips the check
+        self.min_size = math.ceil(min_points * page_size[0] / badge_maker.page_width) if min_points else 0
+        self.min_points = min_points
+        self.problems = []
+        self.notes = []  # Worth knowing but rendered fine, e.g. a hotel without its own backside
+        self.legible = {}  # (text, max_width) -> fits at min_size, so repeated surnames are measured once
+        self.advances = {}  # char -> advance width at min_size
+
+    def check(self, names_with_gender, group, hotel_name, destination):
+        """Collect every problem with a roster and its assets; nothing is rendered."""
+        badge_maker = self.badge_maker
+        for path in (badge_maker.template_men, badge_maker.template_women, badge_maker.backside_template):
+            if not os.path.exists(path):
+                self.problems.append(f"Template {path} does not exist")
+
+        backside = badge_maker.backside_path(hotel_name)
+        if backside == badge_maker.backside_template:
+            self.notes.append(f"Hotel {hotel_name!r} has no {hotel_name}.png; using {backside} with the name on it")
+            hotel_size, _ = self.geometry.hotel
+            self.check_glyphs(f"hotel {hotel_name!r}", hotel_name)
+            if badge_maker.fonts.text_width(hotel_name, hotel_size) > self.badge_size[0]:
+                self.notes.append(f"Hotel name {hotel_name!r} is wider than the badge and will be cut off")
+
+        self.check_text(f"destination {destination!r}", destination, self.geometry.destination)
+        self.check_text(f"group {group!r}", group, self.geometry.group)
+        self.check_text(f"group {group!r} on the backside", group, self.geometry.back_group)
+
+        for number, entry in enumerate(names_with_gender, 1):
+            name = entry.get("name") or ""
+            label = f"passenger {number} ({name!r})"
+            if entry.get("gender") not in GENDERS:
+                self.problems.append(f"{label}: gender must be one of {', '.join(GENDERS)}, "
+                                     f"got {entry.get('gender')!r}")
+            parts = name.split(maxsplit=1)
+            if len(parts) < 2:
+                self.problems.append(f"{label}: needs a surname and a first name")
+                continue
+            self.check_text(f"{label} surname", parts[0], self.geometry.surname)
+            self.check_text(f"{label} first name", parts[1], self.geometry.first_name)
+        return self
+
+    def check_glyphs(self, label, text):
+        missing = sorted({char for char in text if ord(char) not in self.charset})
+        if missing:
+            self.problems.append(f"{label}: the font has no glyph for {' '.join(missing)}")
+            return False
+        return True
+
+    def check_text(self, label, text, box):
+        """Glyph coverage, and whether text still fits its box at the smallest legible size."""
+        if not self.check_glyphs(label, text) or not self.min_size:
+            return
+        _, _, max_width, font_ratio = box
+        if int(self.badge_size[1] * font_ratio) <= self.min_size:
+            return  # Already at or below the floor at full size; nothing shrinks further
+        # Width grows with size, so text that fits at the floor never shrinks below it
+        key = (text, max_width)
+        if key not in self.legible:
+            self.legible[key] = self.fits(text, max_width)
+        if not self.legible[key]:
+            self.problems.append(f"{label}: would shrink below {self.min_points}pt to fit the badge")
+
+    def fits(self, text, max_width):
+        """Whether text fits max_width at min_size."""
+        # Summed advances stay within a few percent of the laid-out width, which costs a
+        # FreeType layout per string; only lay out the strings close to the limit
+        font = self.badge_maker.fonts.font(self.min_size)
+        estimate = 0
+        for char in text:
+            if char not in self.advances:
+                self.advances[char] = font.getlength(char)
+            estimate += self.advances[char]
+        if estimate * 1.1 <= max_width:
+            return True
+        if estimate * 0.9 > max_width:
+            return False
+        return self.badge_maker.fonts.measure(text, font) <= max_width
+
+    def raise_problems(self):
+        if self.problems:
+            raise PreflightError(self.problems)
@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+STAGES = ("preflight", "template_load", "font_fitting", "text_drawing", "page_compositing", "image_encoding",
+          "pdf_embed", "pdf_write", "pdf_merge")
+
+
+class Profiler:
+    def __init__(self):
+        self.stages = {}  # stage -> [calls, seconds]
+        self.counters = {}  # e.g. pages written, cache hits reported by pool workers
+        # Whole loop iterations for ETAs, e.g. "page" -> [calls, seconds]; they span stages, so report() leaves them out
+        self.laps = {}
+        self.sent_counters = {}  # Cache counters already handed to the parent by take()
+        self.start_time = time.perf_counter()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Time one pass through a pipeline stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds, calls=1):
+        with self.lock:
+            stage = self.stages.setdefault(name, [0, 0.0])
+            stage[0] += calls
+            stage[1] += seconds
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def lap(self, name, seconds):
+        with self.lock:
+            lap = self.laps.setdefault(name, [0, 0.0])
+            lap[0] += 1
+            lap[1] += seconds
+
+    def mean_lap(self, name):
+        """Average seconds per lap, or None before the first one."""
+        calls, seconds = self.laps.get(name, (0, 0.0))
+        return seconds / calls if calls else None
+
+    def busiest(self):
+        """The instrumented stage with the most accumulated time so far."""
+        timed = [(seconds, name) for name, (_, seconds) in self.stages.items() if name in STAGES]
+        return max(timed)[1] if timed else None
+
+    def take(self, cache_counters):
+        """Hand stage timings and new cache hits to the parent process and reset them here."""
+        with self.lock:
+            stages, self.stages = self.stages, {}
+        counters = {name: value - self.sent_counters.get(name, 0) for name, value in cache_counters.items()}
+        self.sent_counters = dict(cache_counters)
+        return {"stages": stages, "counters": counters}
+
+    def merge(self, profile):
+        for name, (calls, seconds) in profile["stages"].items():
+            self.add(name, seconds, calls)
+        for name, value in profile["counters"].items():
+            self.count(name, value)
+
+    def report(self, cache_counters):
+        """Machine-readable summary: per-stage calls and time, counters and cache hit rates."""
+        counters = dict(self.counters)
+        for name, value in cache_counters.items():
+            counters[name] = counters.get(name, 0) + value
+
+        caches = {}
+        for name in sorted(counters):
+            if name.endswith("_hits"):
+                cache = name[:-len("_hits")]
+                hits, misses = counters[name], counters.get(f"{cache}_misses", 0)
+                caches[cache] = {"hits": hits, "misses": misses,
+                                 "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None}
+
+        return {
+            "wall_seconds": round(time.perf_counter() - self.start_time, 4),
+            "stages": {
+                name: {"calls": calls, "seconds": round(seconds, 4), "mean_ms": round(1000 * seconds / calls, 3)}
+                for name, (calls, seconds) in sorted(self.stages.items(), key=lambda item: -item[1][1])
+            },
+            "counters": {name: value for name, value in counters.items() if not name.endswith(("_hits", "_misses"))},
+            "caches": caches,
+        }
+
+    def save(self, path, cache_counters, **extra):
+        report = dict(extra, **self.report(cache_counters))
+        with open(path, "w", encoding="utf-8") as report_file:
+            json.dump(report, report_file, indent=2)
+        return report
@@ -0,0 +1,166 @@
+"""Content-addressed on-disk cache of rendered badge tiles and composed pages.
+
+Usage: python render_cache.py stats|clear [--cache-dir DIR]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+from PIL import Image
+
+DEFAULT_CACHE_DIR = ".badge_cache"
+STATS_FILE = "stats.json"
+KINDS = ("badge", "page")
+
+
+def code_fingerprint(*functions):
+    """Digest of the bytecode and constants of functions, so layout edits invalidate cached renders."""
+    digest = hashlib.sha256()
+    codes = [function.__code__ for function in functions]
+    while codes:
+        code = codes.pop()
+        digest.update(code.co_code)
+        for const in code.co_consts:
+            if isinstance(const, type(code)):
+                codes.append(const)  # Comprehensions and nested functions
+            else:
+                digest.update(repr(const).encode())
+    return digest.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=2 * 1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes  # Size limit of the cached images on disk
+        self.total_bytes = None  # Scanned lazily on the first write
+        self.file_digests = {}  # (path, mtime) -> sha256 of the file contents
+        self.counts = {f"{kind}_{outcome}": 0 for kind in KINDS for outcome in ("hits", "misses")}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        """Hash the inputs of a render into a cache key."""
+        return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+    def file_digest(self, path):
+        """Hash of a template or font file, recomputed only when the file changes."""
+        cache_key = (path, os.path.getmtime(path))
+        digest = self.file_digests.get(cache_key)
+        if digest is None:
+            with open(path, "rb") as source:
+                digest = hashlib.sha256(source.read()).hexdigest()
+            self.file_digests[cache_key] = digest
+        return digest
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def get(self, kind, key):
+        """Return the cached image for key, or None."""
+        path = self.path(key)
+        try:
+            with Image.open(path) as cached:
+                image = cached.copy()
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:  # Missing or unreadable (e.g. half-evicted) entries are re-rendered
+            self.counts[f"{kind}_misses"] += 1
+            return None
+        self.counts[f"{kind}_hits"] += 1
+        return image
+
+    def put(self, key, image):
+        """Store an image under key; concurrent writers of the same key are harmless."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as temp_file:
+            image.save(temp_file, "PNG", compress_level=1)
+        os.chmod(temp_path, 0o644)  # mkstemp makes it private; the cache is shared between users
+        os.replace(temp_path, path)
+
+        if self.total_bytes is None:
+            self.total_bytes = sum(size for _, size, _ in self.entries())
+        else:
+            self.total_bytes += os.path.getsize(path)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """(path, size, mtime) of every cached image."""
+        for root, _, files in os.walk(self.cache_dir):
+            for file_name in files:
+                if file_name.endswith(".png"):
+                    stat = os.stat(os.path.join(root, file_name))
+                    yield os.path.join(root, file_name), stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """Delete least recently used images until the cache is back under 90% of its limit."""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self.total_bytes <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+
+    def save_stats(self, last_run):
+        """Add one run's hits and misses (badge_hits, page_misses, ...) to the cumulative stats file.
+
+        Call it once per invocation with the counts of every BadgeMaker in it; batch runs sum their groups first.
+        """
+        stats = self.load_stats(self.cache_dir)
+        for name, value in last_run.items():
+            stats["total"][name] = stats["total"].get(name, 0) + value
+        stats["last_run"] = last_run
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as stats_file:
+            json.dump(stats, stats_file, indent=2)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, os.path.join(self.cache_dir, STATS_FILE))  # Readers never see a half-written file
+
+    @staticmethod
+    def load_stats(cache_dir):
+        try:
+            with open(os.path.join(cache_dir, STATS_FILE), encoding="utf-8") as stats_file:
+                return json.load(stats_file)
+        except (FileNotFoundError, ValueError):
+            return {"total": {}, "last_run": {}}
+
+
+def print_stats(cache_dir):
+    stats = RenderCache.load_stats(cache_dir)
+    entries = list(RenderCache(cache_dir).entries())
+    print(f"Cache: {cache_dir} ({len(entries)} images, {sum(size for _, size, _ in entries) / 1024 / 1024:.1f} MB)")
+    for label in ("last_run", "total"):
+        counts = stats[label]
+        print(f"{label.replace('_', ' ').capitalize()}:")
+        for kind in KINDS:
+            hits = counts.get(f"{kind}_hits", 0)
+            misses = counts.get(f"{kind}_misses", 0)
+            rate = hits / (hits + misses) if hits + misses else 0
+            print(f"  {kind + 's':<7} {hits:>6} hits {misses:>6} misses ({rate:.0%} hit rate)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or clear the rendered badge cache.")
+    parser.add_argument("command", choices=("stats", "clear"))
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        print_stats(args.cache_dir)
+    else:
+        cache = RenderCache(args.cache_dir)
+        cache.max_bytes = 0
+        cache.evict()
+        print(f"Cleared {args.cache_dir}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
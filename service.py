@@ -0,0 +1,247 @@
+"""Local badge render service that keeps fonts and templates warm between jobs.
+
+Usage: python service.py [--host 127.0.0.1] [--port 8765] [--unix PATH] [--workers N] [--max-queue N]
+
+POST /jobs with a JSON body renders a roster and streams the PDF back:
+    {"group": "GROUP 152", "hotel": "Al-Ebaa", "destination": "MAKKAH",
+     "passengers": [{"name": "MAKHMUDOV ZOKIRJON", "gender": "M"}, ...],
+     "vector": false, "codec": "flate", "tier": "print"}
+GET /stats reports queue depth, running jobs and per-job latency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from asset_pack import DEFAULT_PACK_DIR, AssetPack
+from font_fitter import FontFitter
+from main import (TIERS, BadgeMaker, backside_template, badge_size, font_path, template_men, template_women,
+                  text_color)
+from pdf_writer import CODECS
+from preflight import PreflightError
+from template_cache import TemplateCache
+from text_runs import TextRunCache
+
+CHUNK_SIZE = 64 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RenderService:
+    def __init__(self, workers=2, max_queue=32, max_body=16 * 1024 * 1024, pack_dir=DEFAULT_PACK_DIR):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self.workers = workers
+        self.max_queue = max_queue  # Jobs waiting or running before new ones are turned away
+        self.max_body = max_body
+        # Shared by every job for the lifetime of the service, mapped from the pre-scaled template pack
+        self.templates = TemplateCache(pack=AssetPack(pack_dir))
+        self.fonts = FontFitter(font_path)
+        self.text_runs = TextRunCache()
+        self.pending = 0  # Accepted jobs not yet finished, touched only on the event loop
+        self.running = 0  # Jobs on a pool thread right now
+        self.running_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.latencies = deque(maxlen=1000)  # Seconds from request to finished PDF, most recent jobs
+
+    def warm_up(self):
+        """Decode the standard templates and load the base font before the first job arrives."""
+        for path in (template_men, template_women, backside_template):
+            self.templates.load(path, badge_size)
+        self.fonts.font(int(badge_size[1] * 0.06))
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        latency = {}
+        if latencies:
+            latency = {
+                "mean_s": round(statistics.fmean(latencies), 4),
+                "p50_s": round(latencies[len(latencies) // 2], 4),
+                "p95_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4),
+                "max_s": round(latencies[-1], 4),
+            }
+        return {
+            "queue_depth": self.pending - self.running,
+            "running": self.running,
+            "workers": self.workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "latency": latency,
+            "template_cache": {"hits": self.templates.hits, "misses": self.templates.misses},
+            "text_run_cache": {"hits": self.text_runs.hits, "misses": self.text_runs.misses},
+        }
+
+    def render(self, job, output_pdf):
+        """Render one roster to output_pdf; runs on a pool thread."""
+        with self.running_lock:
+            self.running += 1
+        try:
+            badge_maker = BadgeMaker(template_men, template_women, backside_template, font_path, output_pdf, text_color,
+                                     stream=True, codec=job["codec"], vector=job["vector"], tier=job["tier"],
+                                     templates=self.templates, fonts=self.fonts, text_runs=self.text_runs,
+                                     verbose=False)
+            badge_maker.process(job["passengers"], job["group"], badge_maker.badge_size, badge_maker.page_size,
+                                job["hotel"], job["destination"])
+            badge_maker.create_pdf()
+        finally:
+            with self.running_lock:
+                self.running -= 1
+
+    @staticmethod
+    def parse_job(body):
+        try:
+            job = json.loads(body)
+        except ValueError as error:
+            raise HttpError(400, f"Invalid JSON: {error}")
+        if not isinstance(job, dict):
+            raise HttpError(400, "Expected a JSON object")
+        missing = [field for field in ("group", "hotel", "destination", "passengers") if not job.get(field)]
+        if missing:
+            raise HttpError(400, f"Missing {', '.join(missing)}")
+        for field in ("group", "hotel", "destination"):
+            if not isinstance(job[field], str):
+                raise HttpError(400, f"{field} must be a string")
+        # The hotel picks "<hotel>.png" from the working directory, so it must not reach any other file
+        if any(char in job["hotel"] for char in ("/", "\\", os.sep, "\0")) or job["hotel"].startswith("."):
+            raise HttpError(400, "hotel must not contain path separators or start with a dot")
+        if not isinstance(job["passengers"], list):
+            raise HttpError(400, "passengers must be a list")
+        for passenger in job["passengers"]:
+            if not isinstance(passenger, dict) or not all(isinstance(passenger.get(field), str) and passenger[field]
+                                                          for field in ("name", "gender")):
+                raise HttpError(400, "Every passenger needs a name and a gender as strings")
+        job.setdefault("vector", False)
+        if not isinstance(job["vector"], bool):
+            raise HttpError(400, "vector must be true or false")
+        job.setdefault("codec", "flate")
+        if not isinstance(job["codec"], str) or job["codec"] not in CODECS:
+            raise HttpError(400, f"codec must be one of {', '.join(CODECS)}")
+        job.setdefault("tier", "print")
+        if not isinstance(job["tier"], str) or job["tier"] not in TIERS:
+            raise HttpError(400, f"tier must be one of {', '.join(TIERS)}")
+        return job
+
+    async def handle(self, reader, writer):
+        try:
+            method, path, headers = await self.read_head(reader)
+            if path == "/stats":
+                if method != "GET":
+                    raise HttpError(405, "Use GET /stats")
+                await self.respond(writer, 200, json.dumps(self.stats()).encode(), "application/json")
+            elif path == "/jobs":
+                if method != "POST":
+                    raise HttpError(405, "Use POST /jobs")
+                length = int(headers.get("content-length", 0))
+                if length > self.max_body:
+                    raise HttpError(413, "Roster too large")
+                await self.run_job(self.parse_job(await reader.readexactly(length)), writer)
+            else:
+                raise HttpError(404, f"No such endpoint {path}")
+        except HttpError as error:
+            await self.respond(writer, error.status, json.dumps({"error": str(error)}).encode(), "application/json")
+        except PreflightError as error:  # Roster problems are the client's to fix, all of them at once
+            body = {"error": "Roster failed preflight", "problems": error.problems}
+            await self.respond(writer, 400, json.dumps(body).encode(), "application/json")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as error:  # Report render failures to the client instead of dropping the connection
+            await self.respond(writer, 500, json.dumps({"error": repr(error)}).encode(), "application/json")
+        finally:
+            writer.close()
+
+    async def run_job(self, job, writer):
+        if self.pending >= self.max_queue:
+            raise HttpError(503, f"Queue full ({self.pending} jobs)")
+        start_time = time.perf_counter()
+        self.pending += 1
+        fd, output_pdf = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        try:
+            try:
+                await asyncio.get_running_loop().run_in_executor(self.executor, self.render, job, output_pdf)
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self.pending -= 1
+            self.completed += 1
+            self.latencies.append(time.perf_counter() - start_time)
+
+            size = os.path.getsize(output_pdf)
+            await self.write_head(writer, 200, "application/pdf", size)
+            with open(output_pdf, "rb") as pdf:
+                while chunk := pdf.read(CHUNK_SIZE):
+                    writer.write(chunk)
+                    await writer.drain()
+        finally:
+            os.remove(output_pdf)
+
+    @staticmethod
+    async def read_head(reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise HttpError(400, "Malformed request line")
+        method, path, _ = request_line
+        headers = {}
+        while (line := (await reader.readline()).decode("latin-1").strip()):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return method.upper(), path.split("?", 1)[0], headers
+
+    @staticmethod
+    async def write_head(writer, status, content_type, length):
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {length}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+
+    async def respond(self, writer, status, body, content_type):
+        await self.write_head(writer, status, content_type, len(body))
+        writer.write(body)
+        await writer.drain()
+
+
+async def serve(service, host, port, unix_path):
+    if unix_path:
+        server = await asyncio.start_unix_server(service.handle, path=unix_path)
+        print(f"Render service listening on {unix_path}")
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+        print(f"Render service listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve badge PDFs over HTTP with warm fonts and templates.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="jobs rendered at the same time")
+    parser.add_argument("--max-queue", type=int, default=32, help="jobs accepted before answering 503")
+    args = parser.parse_args(argv)
+
+    service = RenderService(workers=args.workers, max_queue=args.max_queue)
+    service.warm_up()
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.executor.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+
+class TemplateCache:
+    def __init__(self, max_bytes=512 * 1024 * 1024, pack=None):
+        self.max_bytes = max_bytes  # Memory cap for decoded templates
+        self.pack = pack  # AssetPack to map pre-scaled templates from instead of decoding the PNGs
+        self.entries = OrderedDict()  # (path, size, mode) -> (mtime, image), oldest first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()  # Batch runs share one cache between threads
+
+    def get(self, path, size, mode="RGBA"):
+        """Return a drawable copy of the template at path, converted and resized once."""
+        return self.load(path, size, mode).copy()
+
+    def load(self, path, size, mode="RGBA"):
+        """Return the shared decoded template; callers must not draw on it."""
+        with self.lock:
+            key = (path, tuple(size), mode)
+            mtime = os.path.getmtime(path)
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == mtime:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[1]
+
+            self.misses += 1
+            if entry is not None:
+                self.drop(key)  # File changed on disk since it was decoded
+
+            if self.pack is not None:
+                image = self.pack.image(path, size, mode)  # Read-only pages shared with other processes
+            else:
+                with Image.open(path) as source:
+                    image = source.convert(mode).resize(size)
+            self.entries[key] = (mtime, image)
+            self.total_bytes += self.image_bytes(image)
+            self.evict()
+            return image
+
+    def drop(self, key):
+        """Forget a single cached template."""
+        _, image = self.entries.pop(key)
+        self.total_bytes -= self.image_bytes(image)
+
+    def evict(self):
+        """Drop least recently used templates until the cache fits its memory cap."""
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            self.drop(next(iter(self.entries)))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    @staticmethod
+    def image_bytes(image):
+        return image.width * image.height * len(image.getbands())
@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+# Masks are drawn with draw_bitmap and draw_ink of Pillow's C drawing object, which are not public API. Checked
+# once here so a Pillow that drops them makes every run fall back to draw.text instead of failing mid-PDF.
+CORE_DRAW = all(hasattr(ImageDraw.Draw(Image.new("L", (1, 1))).draw, name) for name in ("draw_bitmap", "draw_ink"))
+
+
+class TextRunCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes  # Memory cap for rasterized text masks
+        self.entries = OrderedDict()  # (text, font path, size, mode) -> (mask, offset), oldest first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()  # Batch runs share one cache between threads
+
+    def mask(self, text, font, mode="L"):
+        """Return the glyph coverage mask of text and its offset from the draw position, rasterized once."""
+        with self.lock:
+            key = (text, font.path, font.size, mode)
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry
+
+            self.misses += 1
+            entry = font.getmask2(text, mode, start=(0, 0))  # The FreeType layout and raster ImageDraw.text does
+            self.entries[key] = entry
+            self.total_bytes += self.mask_bytes(entry[0])
+            self.evict()
+            return entry
+
+    def draw(self, draw, xy, text, font, fill):
+        """Draw a single line of text exactly like draw.text(xy, text, font=font, fill=fill)."""
+        x, y = xy
+        cacheable = (CORE_DRAW and isinstance(font, ImageFont.FreeTypeFont) and draw.fontmode in ("1", "L")
+                     and draw.palette is None and fill is not None and "\n" not in text
+                     and x == int(x) and y == int(y))  # Sub-pixel origins rasterize differently
+        if not cacheable:
+            draw.text(xy, text, font=font, fill=fill)
+            return
+        # The colour is applied here, so one mask serves every fill
+        color = ImageColor.getcolor(fill, draw.mode) if isinstance(fill, str) else fill
+        mask, (offset_x, offset_y) = self.mask(text, font, draw.fontmode)
+        draw.draw.draw_bitmap((int(x) + offset_x, int(y) + offset_y), mask, draw.draw.draw_ink(color))
+
+    def evict(self):
+        """Drop least recently used masks until the cache fits its memory cap."""
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            mask, _ = self.entries.popitem(last=False)[1]
+            self.total_bytes -= self.mask_bytes(mask)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    @staticmethod
+    def mask_bytes(mask):
+        return mask.size[0] * mask.size[1]  # "1" and "L" masks are one byte per pixel
@@ -0,0 +1,57 @@
+from fpdf import FPDF
+from PIL import ImageColor
+
+
+class VectorPdfWriter:
+    def __init__(self, badge_maker, output_pdf, page_size, badge_size, page_width=595, page_height=842):
+        self.badge_maker = badge_maker
+        self.output_pdf = output_pdf
+        self.badge_size = badge_size
+        self.scale = page_width / page_size[0]  # PDF points per layout pixel
+        self.slots = badge_maker.slot_positions(page_size, badge_size)
+        self.back_slots = badge_maker.slot_positions(page_size, badge_size, back=True)
+        self.pdf = FPDF(unit="pt", format=(page_width, page_height))
+        self.pdf.set_auto_page_break(False)
+        self.pdf.add_font("badge", fname=badge_maker.font_path)  # Embedded once, subset to the glyphs used
+        self.page_count = 0
+
+    def add_front_page(self, entries, group):
+        """Lay out up to a page of badges; empty slots stay blank."""
+        badge_maker = self.badge_maker
+        self.pdf.add_page()
+        for entry, slot in zip(entries, self.slots):
+            template_path = badge_maker.template_men if entry["gender"] == "M" else badge_maker.template_women
+            with badge_maker.profiler.stage("font_fitting"):
+                runs = badge_maker.badge_text(entry["name"], group, self.badge_size)
+            self.draw_tile(template_path, runs, slot)
+        self.page_count += 1
+
+    def add_back_page(self, group, hotel_name, destination):
+        badge_maker = self.badge_maker
+        template_path = badge_maker.backside_path(hotel_name)
+        with badge_maker.profiler.stage("font_fitting"):
+            runs = badge_maker.backside_text(group, hotel_name, destination, self.badge_size)
+        self.pdf.add_page()
+        for slot in self.back_slots:
+            self.draw_tile(template_path, runs, slot)
+        self.page_count += 1
+
+    def draw_tile(self, template_path, runs, slot):
+        """Place the template artwork and draw its text runs as PDF text."""
+        scale = self.scale
+        slot_x, slot_y = slot
+        badge_width, badge_height = self.badge_size
+        # FPDF embeds each template file once and references it from every tile
+        with self.badge_maker.profiler.stage("pdf_embed"):
+            self.pdf.image(template_path, slot_x * scale, slot_y * scale, badge_width * scale, badge_height * scale)
+        with self.badge_maker.profiler.stage("text_drawing"):
+            for text, font, (x, y), fill in runs:
+                ascent = font.getmetrics()[0]  # Pillow places text by its ascender line, PDF by its baseline
+                self.pdf.set_font("badge", size=font.size * scale)
+                self.pdf.set_text_color(*(ImageColor.getrgb(fill) if isinstance(fill, str) else fill))
+                self.pdf.text((slot_x + x) * scale, (slot_y + y + ascent) * scale, text)
+
+    def close(self):
+        """Write the finished document to output_pdf."""
+        with self.badge_maker.profiler.stage("pdf_write"):
+            self.pdf.output(self.output_pdf)